@@ -1,4 +1,4 @@
-import json
+from tracking.json_stream import FrameReader
 
 from .detached_overlay_manager import DetachedOverlayManager
 from .overlay_creator import OverlayCreator
@@ -45,10 +45,14 @@ class JSONOverlayManager:
         self.connect_signals()
 
     def load_json_data(self, json_path):
-        with open(json_path) as f:
-            data = json.load(f)
+        # Stream the frames one at a time instead of json.load-ing the whole file
+        reader = FrameReader(json_path, frames_key="frames")
+
+        # Convert frames list to dictionary for faster lookup
+        self.frame_data = {frame["fr"]: frame["obj"] for frame in reader}
 
         # Store video dimensions from metadata if available
+        data = reader.metadata
         if "metadata" in data:
             metadata = data["metadata"]
             if "width" in metadata and "height" in metadata:
@@ -58,9 +62,6 @@ class JSONOverlayManager:
                 self.field_width = metadata.get("field_width", self.field_width)
                 self.field_height = metadata.get("field_height", self.field_height)
 
-        # Convert frames list to dictionary for faster lookup
-        self.frame_data = {frame["fr"]: frame["obj"] for frame in data["frames"]}
-
     def connect_signals(self):
         self.player.viewResized.connect(self.update_view_sizes)
         self.player.media_player.positionChanged.connect(self.update_overlays)
@@ -0,0 +1,48 @@
+"""Concurrent ingests of one detection file must not corrupt its store."""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from tracking import detection_store
+from tracking.synthetic import generate_match
+
+
+def _write(json_path, **kwargs):
+    frames, _ = generate_match(n_frames=300, **kwargs)
+    with open(json_path, "w") as f:
+        json.dump(frames, f)
+    return frames
+
+
+def test_concurrent_ingests(tmp_path):
+    json_path = str(tmp_path / "radon.json")
+    frames = _write(json_path)
+
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        store_paths = list(executor.map(detection_store.ingest, [json_path] * 8))
+
+    assert set(store_paths) == {detection_store.default_store_path(json_path)}
+    assert sorted(os.listdir(tmp_path)) == ["radon.json", "radon.store"]
+    assert not detection_store.is_stale(json_path)
+    store = detection_store.load(json_path)
+    np.testing.assert_array_equal(
+        store.frame_index, [frame["frame_index"] for frame in frames]
+    )
+
+
+def test_ingest_replaces_an_outdated_store(tmp_path):
+    json_path = str(tmp_path / "radon.json")
+    _write(json_path, seed=0)
+    detection_store.ingest(json_path)
+    frames = _write(json_path, seed=1, start_frame=1000)
+    assert detection_store.is_stale(json_path)
+
+    detection_store.ingest(json_path)
+    assert sorted(os.listdir(tmp_path)) == ["radon.json", "radon.store"]
+    store = detection_store.load(json_path)
+    np.testing.assert_array_equal(
+        store.frame_index, [frame["frame_index"] for frame in frames]
+    )
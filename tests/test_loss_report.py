@@ -0,0 +1,46 @@
+"""Held ids stay reserved without starving new tracks of ids."""
+
+import numpy as np
+import pytest
+
+from tracking.config import DEFAULT_CONFIG
+from tracking.detection_store import DetectionChunk
+from tracking.loss_report import LossReport
+from tracking.synthetic import generate_match
+from tracking.tracker import track_chunk
+
+
+@pytest.fixture(scope="module")
+def held_run():
+    # Occlusions longer than lost_report_frames hold many ids
+    frames, _ = generate_match(n_frames=600, seed=0, dropout=0.01, max_occlusion=120)
+    chunk = DetectionChunk.from_frames(frames)
+    losses = LossReport()
+    _, _, frame_indices, records = track_chunk(
+        chunk,
+        int(chunk.frame_index[0]),
+        {},
+        stop_on_loss=False,
+        losses=losses,
+        fill=False,
+    )
+    return frame_indices, records, losses
+
+
+def test_held_ids_are_not_reused(held_run):
+    frame_indices, records, losses = held_run
+    record_frames = np.asarray(frame_indices)[records[:, 0].astype(np.int64)]
+    assert len(losses) > 0
+    for loss in losses.losses():
+        later = records[record_frames > loss["frame"]]
+        assert not np.isin(later[:, 1], loss["ids"]).any(), loss
+
+
+def test_new_tracks_get_spare_ids(held_run):
+    _, records, losses = held_run
+    held = sum(len(loss["ids"]) for loss in losses.losses())
+    # 22 players and 23 ids: without spare ids, two held ids exhaust the pool
+    assert held >= 2
+    assert records[:, 1].max() > DEFAULT_CONFIG.max_allowed_id
+    assert records[:, 1].max() <= DEFAULT_CONFIG.max_allowed_id + held
+    assert set(losses.untracked()) == {"frames", "tracks"}
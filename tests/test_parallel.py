@@ -0,0 +1,52 @@
+"""Stitched windows must cover the match once and keep ids at boundaries."""
+
+import json
+
+import numpy as np
+import pytest
+
+from tracking.config import DEFAULT_CONFIG
+from tracking.parallel import plan_windows, track_match
+from tracking.synthetic import generate_match
+
+CHUNK_LENGTH = 300
+OVERLAP_LENGTH = 60
+
+
+@pytest.fixture(scope="module")
+def stitched(tmp_path_factory):
+    frames, _ = generate_match(
+        n_frames=1200, seed=0, dropout=0.02, max_occlusion=60, max_speed=1.5
+    )
+    json_path = str(tmp_path_factory.mktemp("match") / "radon.json")
+    with open(json_path, "w") as f:
+        json.dump(frames, f)
+    frame_indices, records = track_match(
+        json_path, CHUNK_LENGTH, OVERLAP_LENGTH, max_workers=1
+    )
+    return [frame["frame_index"] for frame in frames], frame_indices, records
+
+
+def test_every_frame_is_covered_once(stitched):
+    frames, frame_indices, records = stitched
+    np.testing.assert_array_equal(frame_indices, frames)
+    assert records[:, 0].min() >= 0
+    assert records[:, 0].max() < len(frame_indices)
+
+
+def test_ids_do_not_jump_at_window_boundaries(stitched):
+    frames, frame_indices, records = stitched
+    windows = plan_windows(frames, CHUNK_LENGTH, OVERLAP_LENGTH)
+    assert len(windows) > 2
+    for _, start, _ in windows[1:]:
+        pos = int(np.searchsorted(frame_indices, start))
+        before = records[records[:, 0] == pos - 1]
+        after = records[records[:, 0] == pos]
+        common, rows_before, rows_after = np.intersect1d(
+            before[:, 1], after[:, 1], return_indices=True
+        )
+        assert len(common) > 0
+        distances = np.linalg.norm(
+            before[rows_before, 3:5] - after[rows_after, 3:5], axis=1
+        )
+        assert distances.max() <= DEFAULT_CONFIG.max_match_distance, start
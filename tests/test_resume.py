@@ -0,0 +1,44 @@
+"""Resuming a tracking run from a checkpoint must not change its output."""
+
+import numpy as np
+import pytest
+
+from tracking.config import DEFAULT_CONFIG
+from tracking.detection_store import DetectionChunk
+from tracking.synthetic import generate_match
+from tracking.tracker import track_chunk
+from tracking.tracker_state import CheckpointStore, checkpoint_key
+
+
+@pytest.fixture(scope="module")
+def uninterrupted():
+    # Long occlusions leave gaps spanning the checkpoints
+    frames, _ = generate_match(n_frames=900, seed=0, dropout=0.02, max_occlusion=60)
+    chunk = DetectionChunk.from_frames(frames)
+    start_frame = int(chunk.frame_index[0])
+    checkpoints = CheckpointStore()
+    _, _, _, records = track_chunk(
+        chunk, start_frame, {}, checkpoints=checkpoints, stop_on_loss=False
+    )
+    return chunk, start_frame, checkpoints, records
+
+
+@pytest.mark.parametrize("which", [0.25, 0.5, 0.75])
+def test_resume_matches_uninterrupted_run(uninterrupted, which):
+    chunk, start_frame, checkpoints, records = uninterrupted
+    key = checkpoint_key(start_frame, {}, DEFAULT_CONFIG)
+    frames = checkpoints.frames(key)
+    frame = frames[int(len(frames) * which)]
+    pos = chunk.position(frame)
+
+    _, _, _, resumed = track_chunk(
+        chunk.take(np.arange(pos + 1, len(chunk))),
+        start_frame,
+        {},
+        state=checkpoints.load(key, frame),
+        stop_on_loss=False,
+    )
+
+    expected = records[records[:, 0] > pos].copy()
+    expected[:, 0] -= pos + 1
+    np.testing.assert_array_equal(resumed, expected)
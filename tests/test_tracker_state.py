@@ -0,0 +1,65 @@
+"""A restored TrackerState must track on exactly like the original."""
+
+import pickle
+
+import numpy as np
+import pytest
+import supervision as sv
+
+from tracking.config import DEFAULT_CONFIG
+from tracking.detection_store import DetectionChunk
+from tracking.synthetic import generate_match
+from tracking.tracker import track_chunk
+from tracking.tracker_state import CheckpointStore, TrackerState
+
+
+def _detections(chunk, pos):
+    rows = chunk.rows(pos)
+    x = chunk.global_x[rows]
+    y = chunk.centers[rows, 1]
+    return sv.Detections(
+        xyxy=np.column_stack([x - 2.5, y - 2.5, x + 2.5, y + 2.5]).astype(np.float32),
+        confidence=np.array(chunk.confidence[rows], dtype=np.float32),
+        class_id=np.array(chunk.team_index[rows], dtype=np.int32),
+    )
+
+
+@pytest.fixture
+def tracked_state():
+    frames, _ = generate_match(n_frames=200, seed=0, dropout=0.05, max_occlusion=20)
+    chunk = DetectionChunk.from_frames(frames)
+    state = TrackerState(DEFAULT_CONFIG.create_byte_tracker())
+    track_chunk(
+        chunk.take(np.arange(len(chunk) - 1)),
+        int(chunk.frame_index[0]),
+        {},
+        state=state,
+        stop_on_loss=False,
+    )
+    return chunk, state
+
+
+def test_round_trip_tracks_like_the_original(tracked_state):
+    chunk, state = tracked_state
+    restored = pickle.loads(pickle.dumps(state))
+
+    detections = _detections(chunk, len(chunk) - 1)
+    expected = state.byte_tracker.update_with_detections(detections)
+    actual = restored.byte_tracker.update_with_detections(detections)
+
+    np.testing.assert_array_equal(actual.xyxy, expected.xyxy)
+    np.testing.assert_array_equal(actual.tracker_id, expected.tracker_id)
+    np.testing.assert_array_equal(actual.class_id, expected.class_id)
+    assert restored.track_id_map == state.track_id_map
+    np.testing.assert_array_equal(restored.tracks.center, state.tracks.center)
+
+
+def test_other_supervision_version_is_refused(tracked_state, monkeypatch):
+    _, state = tracked_state
+    checkpoints = CheckpointStore()
+    checkpoints.save("run", state)
+    data = state.to_bytes()
+    monkeypatch.setattr(sv, "__version__", "0.0.0")
+    with pytest.raises(ValueError):
+        TrackerState.from_bytes(data)
+    assert checkpoints.load("run", state.frame_index) is None
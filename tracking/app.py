@@ -1,4 +1,7 @@
-import tracker  # Your tracker module with the update function
+from tracking import bidirectional, tracker  # Tracker modules with the update functions
+from tracking.event_log import EventLog
+from tracking.loss_report import LossReport
+from tracking.profiling import StageProfiler
 
 
 def update_data(data):
@@ -6,7 +9,19 @@ def update_data(data):
 
     Parameters:
         data (dict): {"frame_id":7200, "coords": [{"id":5, "c":[x,y], "src":0},...]}
-        Dictionary expected to contain 'coord_id' and 'frame_id'.
+        Dictionary expected to contain 'coord_id' and 'frame_id'. An optional
+        "log_level" ("debug" or "info") adds the tracking events at or above
+        that level to the result as "events". An optional "profile": true adds
+        a per-stage timing summary of the tracking loop as "profile". An
+        optional "continue_past_loss": true tracks the whole chunk instead of
+        stopping at the first loss; lost ids are held and the result gets
+        "losses", "relink_candidates" and "untracked" (see
+        tracking.loss_report). An
+        optional "bidirectional": true also tracks the chunk backwards, from
+        "anchor_frame" (default: the chunk's last frame) with the optional
+        known-good "anchor_coords", and only reports the losses neither pass
+        resolves (see tracking.bidirectional); events, profile and
+        continue_past_loss do not apply to it.
 
     Returns:
         dict: A dictionary containing the results of the update, or an error message.
@@ -23,9 +38,30 @@ def update_data(data):
         return {"error": "Missing one or more required parameters: coord_id, frame_id"}
 
     try:
+        events = _event_log(data)
+        profiler = StageProfiler() if data.get("profile") else None
+        losses = LossReport() if data.get("continue_past_loss") else None
         # Call the update function from tracker. It is assumed to return:
         # (lost_frame_id, lost_ids, tracking_response)
-        lost_frame_id, lost_ids, tracking_response = tracker.update(frame_id, coord_id)
+        if data.get("bidirectional"):
+            events = profiler = losses = None
+            lost_frame_id, lost_ids, tracking_response = (
+                bidirectional.update_bidirectional(
+                    frame_id,
+                    coord_id,
+                    anchor_frame=data.get("anchor_frame"),
+                    anchor_coords=data.get("anchor_coords"),
+                )
+            )
+        else:
+            lost_frame_id, lost_ids, tracking_response = tracker.update(
+                frame_id,
+                coord_id,
+                events=events,
+                profiler=profiler,
+                stop_on_loss=losses is None,
+                losses=losses,
+            )
     except Exception as e:
         return {"error": str(e)}
 
@@ -37,4 +73,118 @@ def update_data(data):
         tracks = tracking_response
 
     # Return the combined response as a dictionary
-    return {"lost_frame_id": lost_frame_id, "tracks": tracks, "lost_ids": lost_ids}
+    result = {"lost_frame_id": lost_frame_id, "tracks": tracks, "lost_ids": lost_ids}
+    if events is not None:
+        result["events"] = events.query()
+    if profiler is not None:
+        result["profile"] = profiler.summary()
+    if losses is not None:
+        result["losses"] = losses.losses()
+        result["relink_candidates"] = losses.relink_candidates()
+        result["untracked"] = losses.untracked()
+    return result
+
+
+def stream_update_data(data):
+    """Streaming variant of update_data.
+
+    Parameters:
+        data (dict): Same payload as for update_data.
+
+    Yields:
+        dict: One formatted frame ({"fr", "obj"}) per tracked frame as soon as
+        it is available, followed by a final {"lost_frame_id", "lost_ids"}
+        trailer (with "events", "profile", "losses",
+        "relink_candidates" and "untracked" if requested). On failure, an {"error": ...} dict is yielded last instead of
+        the trailer.
+    """
+    if not data:
+        yield {"error": "No JSON payload provided"}
+        return
+
+    coord_id = data.get("coords")
+    frame_id = data.get("frame_id")
+    if coord_id is None or frame_id is None:
+        yield {"error": "Missing one or more required parameters: coord_id, frame_id"}
+        return
+
+    try:
+        events = _event_log(data)
+        profiler = StageProfiler() if data.get("profile") else None
+        losses = LossReport() if data.get("continue_past_loss") else None
+        lost_frame_id, lost_ids = yield from tracker.update_stream(
+            frame_id,
+            coord_id,
+            events=events,
+            profiler=profiler,
+            stop_on_loss=losses is None,
+            losses=losses,
+        )
+    except Exception as e:
+        yield {"error": str(e)}
+        return
+
+    trailer = {"lost_frame_id": lost_frame_id, "lost_ids": lost_ids}
+    if events is not None:
+        trailer["events"] = events.query()
+    if profiler is not None:
+        trailer["profile"] = profiler.summary()
+    if losses is not None:
+        trailer["losses"] = losses.losses()
+        trailer["relink_candidates"] = losses.relink_candidates()
+        trailer["untracked"] = losses.untracked()
+    yield trailer
+
+
+def batch_jobs(data):
+    """Validates a batch payload and extracts its jobs.
+
+    Parameters:
+        data (dict): {"jobs": [{"key": "a", "frame_id": 7200, "coords": [...]}, ...]}
+        Every job is an update_data payload; "key" is optional and defaults
+        to the job's position in the list.
+
+    Returns:
+        list: (key, job) pairs with string keys, or a dict with an error message.
+    """
+    jobs = data.get("jobs") if isinstance(data, dict) else None
+    if not isinstance(jobs, list):
+        return {"error": "Missing required parameter: jobs"}
+
+    keyed = []
+    for index, job in enumerate(jobs):
+        if not isinstance(job, dict):
+            return {"error": f"Job {index} is not an object"}
+        keyed.append((str(job.get("key", index)), job))
+    if len({key for key, _ in keyed}) != len(keyed):
+        return {"error": "Job keys must be unique"}
+    return keyed
+
+
+def batch_update_data(data, map_func=map):
+    """Processes several tracking updates, e.g. corrections queued at different frames.
+
+    With the default map, all jobs run in this process and share its
+    detection store and homography cache, so the data is loaded only once.
+    The service passes its process pool's map to run them concurrently.
+
+    Parameters:
+        data (dict): Batch payload, see batch_jobs.
+        map_func (callable): map-like function used to run update_data over the
+            jobs, e.g. the map method of a process pool executor to run them
+            concurrently. Defaults to the built-in map.
+
+    Returns:
+        dict: {"results": {key: update_data result}}, or an error message.
+    """
+    jobs = batch_jobs(data)
+    if isinstance(jobs, dict):
+        return jobs
+    results = map_func(update_data, [job for _, job in jobs])
+    return {"results": dict(zip([key for key, _ in jobs], results))}
+
+
+def _event_log(data):
+    """Create the EventLog requested by the payload's "log_level", if any."""
+    level = data.get("log_level")
+    return None if level is None else EventLog(level)
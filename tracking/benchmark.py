@@ -0,0 +1,279 @@
+"""Tracking throughput benchmarks on synthetic match data.
+
+Every benchmark runs against a generated match (see tracking.synthetic) in
+a scratch directory, so no real match data is needed. For tracker.update,
+perform_tracking_from_json and format_tracking_data it reports frames per
+second, the time spent in each stage and the peak traced memory.
+
+Usage: python -m tracking.benchmark [frames] [players] [repeat] [report.json]
+"""
+
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from tracking import detection_store, tracker
+from tracking.profiling import StageProfiler
+from tracking.synthetic import generate_match
+from tracking.transform_utility import (
+    LEFT_HOMOGRAPHY_PATH,
+    RIGHT_HOMOGRAPHY_PATH,
+    reverse_transform_points,
+)
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+START_FRAME = 5000
+
+
+@contextlib.contextmanager
+def synthetic_workdir(n_frames=tracker.CHUNK_LENGTH, n_players=22, seed=0, **kwargs):
+    """Run the enclosed code in a scratch directory holding a synthetic match.
+
+    The directory looks like the tracker's usual working directory: the
+    detections in DETECTIONS_PATH plus both homography files.
+
+    :param n_frames: Number of frames of the match.
+    :param n_players: Number of players.
+    :param seed: Random seed of the match.
+    :param kwargs: Further arguments for generate_match().
+    :return: (as the context value) the generated frames.
+    """
+    frames, _ = generate_match(
+        n_frames=n_frames,
+        n_players=n_players,
+        start_frame=START_FRAME,
+        seed=seed,
+        **kwargs,
+    )
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="tracking-bench-")
+    try:
+        for name in (LEFT_HOMOGRAPHY_PATH, RIGHT_HOMOGRAPHY_PATH):
+            shutil.copy(os.path.join(PACKAGE_DIR, name), workdir)
+        with open(os.path.join(workdir, tracker.DETECTIONS_PATH), "w") as f:
+            json.dump(frames, f)
+        os.chdir(workdir)
+        yield frames
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+class Stages:
+    """Accumulates wall-clock time per named stage."""
+
+    def __init__(self):
+        self.seconds = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.seconds[name] = self.seconds.get(name, 0.0) + elapsed
+
+
+def peak_memory(func, *args):
+    """Run func(*args) under tracemalloc and return the peak traced bytes."""
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _measure(name, run, repeat):
+    """Time run() (best of repeat) and measure its peak memory once.
+
+    run(stages) returns the number of frames it processed.
+    """
+    best = None
+    for _ in range(repeat):
+        stages = Stages()
+        start = time.perf_counter()
+        n_frames = run(stages)
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best[0]:
+            best = (seconds, n_frames, stages.seconds)
+    seconds, n_frames, stage_seconds = best
+    return {
+        "name": name,
+        "frames": n_frames,
+        "seconds": seconds,
+        "fps": n_frames / seconds if seconds else float("inf"),
+        "stages": stage_seconds,
+        "peak_memory": peak_memory(run, Stages()),
+    }
+
+
+def start_coords(frames, start_frame=START_FRAME):
+    """Build update() coordinates for every detection of the start frame."""
+    frame = next(frame for frame in frames if frame["frame_index"] == start_frame)
+    centers = np.array([obj["transformed_center"] for obj in frame["objects"]])
+    right = np.array([obj["source"] == "right" for obj in frame["objects"]])
+    global_centers = centers.reshape(-1, 2).copy()
+    global_centers[right, 0] += detection_store.RIGHT_OFFSET
+    is_right, points = reverse_transform_points(global_centers)
+    return [
+        {"id": index + 1, "c": point, "src": int(src)}
+        for index, (point, src) in enumerate(zip(points.tolist(), is_right.tolist()))
+    ]
+
+
+def _legacy_tracking_data(frame_indices, records):
+    """Build the dict structure format_tracking_data expects."""
+    tracking_data = [{"frame_index": frame, "objects": []} for frame in frame_indices]
+    for pos, track_id, class_id, x, y in records.tolist():
+        tracking_data[int(pos)]["objects"].append(
+            {
+                "track_id": int(track_id),
+                "class_id": int(class_id),
+                "confidence": 0.0,
+                "bbox": [x - 2.5, y - 2.5, x + 2.5, y + 2.5],
+                "center": [x, y],
+            }
+        )
+    return tracking_data
+
+
+def benchmark_update(frames, repeat=3):
+    """Benchmark tracker.update from the first frame with all start objects."""
+    coords = start_coords(frames)
+
+    def run(stages):
+        with stages.stage("load"):
+            detection_store.load(tracker.DETECTIONS_PATH)
+        with stages.stage("prepare"):
+            chunk, start_map = tracker._prepare_update(START_FRAME, coords)
+        with stages.stage("track"):
+            _, _, frame_indices, records = tracker.track_chunk(
+                chunk, START_FRAME, start_map
+            )
+        with stages.stage("format"):
+            tracker._format_track_records(frame_indices, records)
+        return len(frame_indices)
+
+    result = _measure("update", run, repeat)
+
+    # End to end, through the public entry point
+    start = time.perf_counter()
+    tracker.update(START_FRAME, coords)
+    result["stages"]["end_to_end"] = time.perf_counter() - start
+    return result
+
+
+def benchmark_perform_tracking(frames, repeat=3):
+    """Benchmark the perform_tracking_from_json stages on the whole chunk.
+
+    Tracking continues past lost tracks (stop_on_loss=False), so the
+    throughput is measured over the full chunk rather than up to the first
+    loss.
+    """
+    store = detection_store.load(tracker.DETECTIONS_PATH)
+    chunk = store.frame_range(START_FRAME, START_FRAME + tracker.CHUNK_LENGTH)
+
+    def run(stages):
+        with stages.stage("track"):
+            _, _, frame_indices, records = tracker.track_chunk(
+                chunk, START_FRAME, {}, stop_on_loss=False
+            )
+        with stages.stage("format"):
+            tracker._format_track_records(frame_indices, records)
+        return len(frame_indices)
+
+    result = _measure("perform_tracking_from_json", run, repeat)
+
+    # One extra, untimed run breaks the loop down by stage
+    profiler = StageProfiler()
+    tracker.track_chunk(chunk, START_FRAME, {}, stop_on_loss=False, profiler=profiler)
+    result["profile"] = profiler.summary()
+    return result
+
+
+def benchmark_format(frames, repeat=3):
+    """Benchmark format_tracking_data on a tracked chunk."""
+    store = detection_store.load(tracker.DETECTIONS_PATH)
+    chunk = store.frame_range(START_FRAME, START_FRAME + tracker.CHUNK_LENGTH)
+    _, _, frame_indices, records = tracker.track_chunk(
+        chunk, START_FRAME, {}, stop_on_loss=False
+    )
+
+    def run(stages):
+        with stages.stage("build"):
+            tracking_data = _legacy_tracking_data(frame_indices, records)
+        with stages.stage("format"):
+            tracker.format_tracking_data(tracking_data)
+        return len(tracking_data)
+
+    return _measure("format_tracking_data", run, repeat)
+
+
+BENCHMARKS = (benchmark_update, benchmark_perform_tracking, benchmark_format)
+
+
+def run_suite(n_frames=tracker.CHUNK_LENGTH, n_players=22, repeat=3, seed=0):
+    """Run all benchmarks on one synthetic match.
+
+    :param n_frames: Number of frames of the match.
+    :param n_players: Number of players.
+    :param repeat: Timing runs per benchmark (the fastest is reported).
+    :param seed: Random seed of the match.
+    :return: List of result dicts ({"name", "frames", "seconds", "fps",
+        "stages", "peak_memory"}).
+    """
+    with synthetic_workdir(n_frames, n_players, seed) as frames:
+        start = time.perf_counter()
+        detection_store.load(tracker.DETECTIONS_PATH)
+        ingest_seconds = time.perf_counter() - start
+
+        results = [benchmark(frames, repeat) for benchmark in BENCHMARKS]
+    results[0]["stages"]["ingest"] = ingest_seconds
+    return results
+
+
+def format_report(results):
+    """Render suite results as a text table."""
+    lines = [
+        f"{'benchmark':<28} {'frames':>7} {'seconds':>9} {'frames/s':>10} "
+        f"{'peak MiB':>9}  stages (ms)"
+    ]
+    for result in results:
+        stages = ", ".join(
+            f"{name}={seconds * 1000:.1f}" for name, seconds in result["stages"].items()
+        )
+        lines.append(
+            f"{result['name']:<28} {result['frames']:>7} {result['seconds']:>9.3f} "
+            f"{result['fps']:>10.1f} {result['peak_memory'] / 2**20:>9.1f}  {stages}"
+        )
+        if "profile" in result:
+            shares = ", ".join(
+                f"{name}={stage['share'] * 100:.1f}%"
+                for name, stage in result["profile"]["stages"].items()
+            )
+            lines.append(f"{'':<28} loop stages: {shares}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 5:
+        print(
+            "Usage: python -m tracking.benchmark [frames] [players] [repeat] [report.json]"
+        )
+        sys.exit(1)
+
+    args = sys.argv[1:4]
+    results = run_suite(*(int(arg) for arg in args))
+    print(format_report(results))
+    if len(sys.argv) == 5:
+        with open(sys.argv[4], "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,281 @@
+"""Bidirectional tracking of an update chunk.
+
+The forward pass tracks the chunk from the corrected start frame as
+update() does, but through the whole chunk. At the same time a second
+worker process tracks the same frames backwards, from the next anchor
+frame (the next known-good correction, or the chunk's last frame) back to
+the start frame. A track the forward pass loses was usually followed by
+the backward pass, which met the player before the loss. merge_passes()
+bridges every forward gap with a backward fragment that agrees with the
+forward track at the gap's ends, and hands a track that was re-acquired
+under a new id back its old id, so short losses close without an operator
+correction. Only the losses that remain are reported.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from tracking import detection_store, tracker
+from tracking.config import DEFAULT_CONFIG
+from tracking.interpolation import fill_gaps
+
+# Pool running the backward passes, created on first use and kept for the
+# life of the process (in the service: one per tracking worker)
+_backward_pool = None
+
+
+def update_bidirectional(
+    start_frame,
+    coord_ids,
+    anchor_frame=None,
+    anchor_coords=None,
+    config=None,
+    executor=None,
+):
+    """Bidirectional variant of tracker.update().
+
+    :param start_frame: The frame index from which to start processing.
+    :param coord_ids: Start frame coordinates, as for update().
+    :param anchor_frame: Frame index the backward pass starts from,
+        defaults to the chunk's last frame.
+    :param anchor_coords: Optional coordinates (same format as coord_ids)
+        of known-good ids at anchor_frame.
+    :param config: Optional TrackerConfig, defaults to DEFAULT_CONFIG.
+    :param executor: Optional process pool executor to run the backward
+        pass in, defaults to this module's single-worker pool.
+    :return: A tuple (frame_index, lost_ids, tracking_result) as returned
+        by update(), with the losses that both passes together could not
+        resolve.
+    """
+    config = config or DEFAULT_CONFIG
+    chunk, start_map = tracker._prepare_update(start_frame, coord_ids)
+    frame_indices = np.asarray(chunk.frame_index)
+    if anchor_frame is None:
+        anchor_frame = int(frame_indices[-1])
+
+    backward = (executor or _get_backward_pool()).submit(
+        _track_backward,
+        tracker.DETECTIONS_PATH,
+        start_frame,
+        anchor_frame,
+        list(anchor_coords or []),
+        config,
+    )
+    forward_records = _observe(chunk, start_frame, start_map, config)
+    backward_frames, backward_records = backward.result()
+
+    # Backward records refer to backward frame positions; use forward ones
+    forward_pos = np.array(
+        [
+            -1 if pos is None else pos
+            for pos in map(chunk.position, backward_frames.tolist())
+        ],
+        dtype=np.int64,
+    )
+    backward_records = backward_records.copy()
+    backward_records[:, 0] = forward_pos[backward_records[:, 0].astype(np.int64)]
+    backward_records = backward_records[backward_records[:, 0] >= 0]
+
+    records = merge_passes(
+        forward_records,
+        backward_records,
+        len(frame_indices),
+        config.max_match_distance,
+        config.max_gap_frames,
+    )
+    stop, lost_ids = find_losses(records, len(frame_indices), config)
+    records = fill_gaps(records[records[:, 0] <= stop], stop + 1, config.max_gap_frames)
+    tracking_result = tracker._format_track_records(frame_indices[: stop + 1], records)
+    return int(frame_indices[stop]), lost_ids, tracking_result
+
+
+def _get_backward_pool():
+    """Return the module's backward-pass pool, starting it on first use."""
+    global _backward_pool
+    if _backward_pool is None:
+        _backward_pool = ProcessPoolExecutor(max_workers=1)
+    return _backward_pool
+
+
+def _observe(chunk, start_frame, start_map, config):
+    """Track a whole chunk and return its observed (M, 5) records."""
+    frames = tracker._iter_tracked_frames(
+        chunk, start_frame, start_map, stop_on_loss=False, config=config
+    )
+    records = []
+    for pos, (_, frame_records) in enumerate(frames):
+        records.extend((pos, *record) for record in frame_records)
+    return tracker._records_array(records)
+
+
+def _track_backward(json_path, start_frame, anchor_frame, anchor_coords, config):
+    # Runs in a worker process; the store is memory-mapped, not pickled.
+    store = detection_store.load(json_path)
+    chunk = store.frame_range(start_frame, anchor_frame + 1)
+    chunk = chunk.take(np.arange(len(chunk))[::-1])
+    anchor_map = {}
+    if anchor_coords:
+        chunk, anchor_map = tracker._map_start_objects(
+            chunk, anchor_frame, anchor_coords
+        )
+    records = _observe(chunk, anchor_frame, anchor_map, config)
+    return np.asarray(chunk.frame_index), records
+
+
+def _dense(records, n_frames, n_ids):
+    """(n_frames, n_ids, 2) positions (NaN where absent) and the id classes."""
+    positions = np.full((n_frames, n_ids, 2), np.nan)
+    classes = np.full(n_ids, -1, dtype=np.int64)
+    pos = records[:, 0].astype(np.int64)
+    ids = records[:, 1].astype(np.int64)
+    positions[pos, ids] = records[:, 3:5]
+    classes[ids] = records[:, 2]
+    return positions, classes
+
+
+def _distances(positions, point):
+    """Distances from point(s) to positions, +inf where a position is NaN."""
+    distances = np.linalg.norm(positions - point, axis=-1)
+    return np.where(np.isnan(distances), np.inf, distances)
+
+
+def merge_passes(forward, backward, n_frames, max_distance, max_bridge):
+    """Close the gaps of forward tracks with agreeing backward fragments.
+
+    For every gap of a forward track, the nearest backward track of the
+    same class within max_distance at the frame before the gap is followed
+    through the gap, as long as it is not already used for another gap,
+    not on top of another forward track and never missing for more than
+    max_bridge frames (such short holes are left to fill_gaps). A gap the
+    forward track recovers from is only filled if the backward track covers
+    all of it and agrees with the forward track again right after it; an
+    open gap (the track is never re-acquired under its id) is filled as far
+    as the backward track goes. If the backward track runs into a forward
+    track that started during the gap, the lost player was re-acquired
+    under that track's id, and both ids are swapped from there on.
+
+    :param forward: (M, 5) observed forward records (frame position, id,
+        class id, x, y), see tracker._iter_tracked_frames.
+    :param backward: (K, 5) observed backward records, with forward frame
+        positions.
+    :param n_frames: Number of frames.
+    :param max_distance: Agreement gate, in top-down pixels.
+    :param max_bridge: Longest hole in a backward track that is bridged,
+        in frames.
+    :return: (M', 5) observed records with forward ids, gaps closed where
+        possible, ordered by frame position and id.
+    """
+    n_ids = int(max(forward[:, 1].max(initial=0), backward[:, 1].max(initial=0))) + 1
+    fwd, fwd_classes = _dense(forward, n_frames, n_ids)
+    bwd, bwd_classes = _dense(backward, n_frames, n_ids)
+    bwd_seen = ~np.isnan(bwd[..., 0])
+    claimed = np.zeros_like(bwd_seen)  # Backward positions used for a gap
+
+    for fid in np.unique(forward[:, 1]).astype(np.int64).tolist():
+        seen = ~np.isnan(fwd[:, fid, 0])
+        pos = int(np.argmax(seen))
+        while True:
+            seen = ~np.isnan(fwd[:, fid, 0])
+            missing = np.flatnonzero(~seen[pos:])
+            if not len(missing):
+                break
+            gap_start = pos + int(missing[0])
+            resumed = np.flatnonzero(seen[gap_start:])
+            gap_stop = gap_start + int(resumed[0]) if len(resumed) else n_frames
+            pos = gap_stop
+
+            # Backward track agreeing with the forward track before the gap
+            before = gap_start - 1
+            candidates = _distances(bwd[before], fwd[before, fid])
+            candidates[(bwd_classes != fwd_classes[fid]) | claimed[before]] = np.inf
+            bid = int(np.argmin(candidates))
+            if candidates[bid] > max_distance:
+                continue
+
+            # Follow it while it is unused, not on another forward track and
+            # missing for at most max_bridge frames at a time
+            observed = gap_start + np.flatnonzero(bwd_seen[gap_start:gap_stop, bid])
+            others = _distances(fwd[observed], bwd[observed, bid][:, None, :])
+            others[:, fid] = np.inf
+            others[:, fwd_classes != fwd_classes[fid]] = np.inf
+            conflict = others.min(axis=1) <= max_distance
+            steps = np.diff(observed, prepend=before)
+            bad = claimed[observed, bid] | conflict | (steps - 1 > max_bridge)
+            length = int(np.argmax(bad)) if bad.any() else len(observed)
+            kept = observed[:length]
+            end = int(kept[-1]) + 1 if length else gap_start
+
+            if length < len(observed) and conflict[length]:
+                # The backward track runs into another forward track. If that
+                # track started during the gap, it is this player re-acquired
+                # under another id: swap both ids from the start of that run
+                meet = int(observed[length])
+                other = int(np.argmin(others[length]))
+                other_seen = ~np.isnan(fwd[:, other, 0])
+                run_start = meet
+                while run_start > gap_start and other_seen[run_start - 1]:
+                    run_start -= 1
+                if not other_seen[run_start - 1]:
+                    kept = kept[kept < run_start]
+                    fwd[kept, fid] = bwd[kept, bid]
+                    claimed[kept, bid] = True
+                    fwd[run_start:, [fid, other]] = fwd[run_start:, [other, fid]]
+                    pos = run_start
+                    continue
+
+            if gap_stop < n_frames:
+                # Closed gap: fill only if bridged completely and agreeing after
+                if length < len(observed) or gap_stop - end > max_bridge:
+                    continue
+                window = slice(gap_stop, min(gap_stop + max_bridge + 1, n_frames))
+                after = _distances(bwd[window, bid], fwd[window, fid])
+                if not len(after) or after.min() > max_distance:
+                    continue
+            fwd[kept, fid] = bwd[kept, bid]
+            claimed[kept, bid] = True
+            if pos < end:
+                pos = end
+
+    frames, ids = np.nonzero(~np.isnan(fwd[..., 0]))
+    return np.column_stack([frames, ids, fwd_classes[ids], fwd[frames, ids]]).astype(
+        np.float64
+    )
+
+
+def find_losses(records, n_frames, config):
+    """Find the first loss that remains after merging.
+
+    A track counts as lost for good once it has been missing for more than
+    config.max_missing_frames + config.lost_report_frames frames, matching
+    the forward loop's reporting.
+
+    :param records: Observed (M, 5) records ordered by frame position.
+    :param n_frames: Number of frames.
+    :param config: The run's TrackerConfig.
+    :return: A tuple (stop, lost_ids): the frame position to stop at (the
+        last one if no loss remains) and the ids missing there for more
+        than config.max_missing_frames, longest missing first.
+    """
+    limit = config.max_missing_frames + config.lost_report_frames
+    stop = n_frames - 1
+    last_seen = {}  # Per id: frame positions of its observations
+    for track_id in np.unique(records[:, 1]).astype(np.int64).tolist():
+        frames = records[records[:, 1] == track_id, 0].astype(np.int64)
+        last_seen[track_id] = frames
+        # Gaps, including the one after the last observation
+        ends = np.append(frames[1:], n_frames)
+        long_gaps = np.flatnonzero(ends - frames - 1 > limit)
+        if len(long_gaps):
+            stop = min(stop, int(frames[long_gaps[0]]) + limit + 1)
+
+    missing = []
+    for track_id, frames in last_seen.items():
+        if frames[0] > stop:
+            continue
+        last = int(frames[np.searchsorted(frames, stop, side="right") - 1])
+        if stop - last > config.max_missing_frames:
+            missing.append((stop - last, track_id))
+    if stop == n_frames - 1 and not any(gap > limit for gap, _ in missing):
+        return stop, []
+    return stop, [track_id for _, track_id in sorted(missing, reverse=True)]
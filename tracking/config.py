@@ -0,0 +1,125 @@
+"""Tunable tracking parameters.
+
+TrackerConfig gathers everything that changes the tracking result: the
+ByteTrack arguments, the distance gate for re-acquiring an id, the lost
+thresholds, the id range, the longest interpolated gap and the detection
+pre-filter. A config is passed to the tracking functions instead of
+hard-coding the values, so that configurations can be compared (see
+tracking.sweep) and results can be cached per configuration.
+"""
+
+import json
+
+import supervision as sv
+
+from tracking.id_assignment import MAX_MATCH_DISTANCE
+from tracking.tracker_state import MAX_ALLOWED_ID
+
+# TrackerConfig fields that are passed on to sv.ByteTrack
+BYTE_TRACK_FIELDS = (
+    "track_activation_threshold",
+    "minimum_matching_threshold",
+    "lost_track_buffer",
+    "frame_rate",
+    "minimum_consecutive_frames",
+)
+
+
+class TrackerConfig:
+    """Parameters of a tracking run.
+
+    :param track_activation_threshold: ByteTrack detection confidence
+        needed to start a track.
+    :param minimum_matching_threshold: ByteTrack matching threshold.
+    :param lost_track_buffer: Frames ByteTrack keeps a lost track around.
+    :param frame_rate: Frame rate of the detections.
+    :param minimum_consecutive_frames: Frames before ByteTrack confirms a
+        track.
+    :param max_match_distance: Distance gate for re-acquiring a used id,
+        in top-down pixels.
+    :param max_missing_frames: Frames an active track may go without an
+        update before it counts as lost.
+    :param lost_report_frames: Frames a track has to stay lost before it
+        is reported (and tracking stops, unless told otherwise).
+    :param max_allowed_id: Highest internal id handed out.
+    :param max_gap_frames: Longest gap in a track, in frames, that is
+        filled by interpolation; longer gaps hold the last position (see
+        tracking.interpolation).
+    :param max_relink_distance: Largest distance between a held id's last
+        center and a new track for a re-link candidate, in top-down pixels
+        (see tracking.loss_report).
+    :param min_confidence: Detections below this confidence are dropped
+        before tracking (see tracking.prefilter). ByteTrack ignores them
+        anyway as long as track_activation_threshold is not lower.
+    :param pitch_polygon: Optional [[x, y], ...] outline of the pitch in
+        the combined top-down view; detections outside it (bench,
+        spectators) are dropped before tracking. None keeps all.
+    """
+
+    def __init__(
+        self,
+        track_activation_threshold=0.1,
+        minimum_matching_threshold=0.98,
+        lost_track_buffer=10,
+        frame_rate=59,
+        minimum_consecutive_frames=1,
+        max_match_distance=MAX_MATCH_DISTANCE,
+        max_missing_frames=10,
+        lost_report_frames=60,
+        max_allowed_id=MAX_ALLOWED_ID,
+        max_gap_frames=30,
+        max_relink_distance=100,
+        min_confidence=0.1,
+        pitch_polygon=None,
+    ):
+        self.track_activation_threshold = track_activation_threshold
+        self.minimum_matching_threshold = minimum_matching_threshold
+        self.lost_track_buffer = lost_track_buffer
+        self.frame_rate = frame_rate
+        self.minimum_consecutive_frames = minimum_consecutive_frames
+        self.max_match_distance = max_match_distance
+        self.max_missing_frames = max_missing_frames
+        self.lost_report_frames = lost_report_frames
+        self.max_allowed_id = max_allowed_id
+        self.max_gap_frames = max_gap_frames
+        self.max_relink_distance = max_relink_distance
+        self.min_confidence = min_confidence
+        self.pitch_polygon = pitch_polygon
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={value!r}" for name, value in vars(self).items())
+        return f"{type(self).__name__}({values})"
+
+    def __eq__(self, other):
+        return isinstance(other, TrackerConfig) and vars(self) == vars(other)
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def to_dict(self):
+        """Return the parameters as a dict."""
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, values):
+        """Create a config from a (partial) parameter dict."""
+        return cls(**values)
+
+    def replace(self, **changes):
+        """Return a copy with some parameters changed."""
+        return type(self)(**{**self.to_dict(), **changes})
+
+    def key(self):
+        """Return a stable string identifying the parameters."""
+        return json.dumps(self.to_dict(), sort_keys=True)
+
+    def byte_track_params(self):
+        """Return the keyword arguments for sv.ByteTrack."""
+        return {name: getattr(self, name) for name in BYTE_TRACK_FIELDS}
+
+    def create_byte_tracker(self):
+        """Create a ByteTrack instance with this configuration."""
+        return sv.ByteTrack(**self.byte_track_params())
+
+
+DEFAULT_CONFIG = TrackerConfig()
@@ -0,0 +1,465 @@
+"""Columnar, memory-mapped storage for frame detection data.
+
+radon.json is ingested once into a directory of flat NumPy arrays (one
+``.npy`` file per column plus a per-frame offset table). Later loads
+memory-map those arrays, so a tracking request only touches the pages of
+the frame range it actually needs instead of re-parsing the whole JSON.
+
+All columns are read-only. Derived values, such as the x coordinate in
+the combined (left + right camera) top-down view, are stored as columns of
+their own instead of being patched into the detections. One loaded store
+can therefore be shared by any number of requests and worker processes.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from array import array
+
+import numpy as np
+
+from tracking.json_stream import FrameReader, iter_frames
+from tracking.transform_utility import RIGHT_OFFSET
+
+STORE_VERSION = 3
+STORE_SUFFIX = ".store"
+MANIFEST_NAME = "manifest.json"
+
+# Detection sources are stored as small integer codes.
+SOURCE_CODES = {"left": 0, "right": 1}
+SOURCE_NAMES = {code: name for name, code in SOURCE_CODES.items()}
+UNKNOWN_SOURCE = -1
+
+_COLUMNS = (
+    "frame_index",
+    "offsets",
+    "centers",
+    "confidence",
+    "team_index",
+    "source",
+    "global_x",
+)
+BYTE_OFFSETS_COLUMN = "byte_offsets"  # Start of every frame in the source JSON
+
+_open_stores = {}  # {abs store path: (manifest, DetectionStore)}
+
+
+def default_store_path(json_path):
+    """Return the store directory used for a detection JSON file.
+
+    :param json_path: Path to the detection JSON file (e.g. radon.json).
+    :return: Path of the sibling store directory (e.g. radon.store).
+    """
+    return os.path.splitext(json_path)[0] + STORE_SUFFIX
+
+
+def source_code(name):
+    """Map a detection "source" string to its stored integer code."""
+    return SOURCE_CODES.get(name, UNKNOWN_SOURCE)
+
+
+def compute_global_x(centers, source):
+    """Compute x in the combined top-down view, where the right camera's
+    coordinates are shifted by RIGHT_OFFSET.
+
+    :param centers: (N, 2) transformed centers as stored.
+    :param source: (N,) source codes.
+    :return: (N,) float64 array.
+    """
+    x = np.array(np.reshape(centers, (-1, 2))[:, 0], dtype=np.float64)
+    x[np.asarray(source) == SOURCE_CODES["right"]] += RIGHT_OFFSET
+    return x
+
+
+def _readonly(values):
+    view = np.asarray(values).view()
+    view.setflags(write=False)
+    return view
+
+
+def _source_signature(json_path):
+    stat = os.stat(json_path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def _read_manifest(store_path):
+    try:
+        with open(os.path.join(store_path, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_stale(json_path, store_path=None):
+    """Check whether the store for json_path is missing or out of date.
+
+    :param json_path: Path to the detection JSON file.
+    :param store_path: Store directory, defaults to default_store_path().
+    :return: True if the store has to be (re)built.
+    """
+    store_path = store_path or default_store_path(json_path)
+    manifest = _read_manifest(store_path)
+    if manifest is None or manifest.get("version") != STORE_VERSION:
+        return True
+    return manifest.get("source") != _source_signature(json_path)
+
+
+def ingest(json_path, store_path=None):
+    """Convert a detection JSON file into a columnar store on disk.
+
+    The JSON is expected to be a list of frames, each with a "frame_index"
+    and an "objects" list whose entries carry "transformed_center",
+    "confidence", "team_index" and "source".
+
+    :param json_path: Path to the detection JSON file.
+    :param store_path: Target directory, defaults to default_store_path().
+    :return: The store directory path.
+    """
+    store_path = store_path or default_store_path(json_path)
+    signature = _source_signature(json_path)
+
+    # Stream the frames so only one frame dict is alive at a time
+    builder = _ColumnBuilder()
+    byte_offsets = array("q")
+    for offset, frame in FrameReader(json_path).iter_with_offsets():
+        builder.add(frame)
+        byte_offsets.append(offset)
+    chunk = builder.build()
+
+    # Write into a scratch directory of our own first, so readers never see
+    # a half-built store and concurrent ingests never share files
+    parent = os.path.dirname(os.path.abspath(store_path))
+    os.makedirs(parent, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(
+        prefix=os.path.basename(store_path) + ".tmp-", dir=parent
+    )
+    try:
+        os.chmod(tmp_path, 0o755)
+        for column in _COLUMNS:
+            np.save(os.path.join(tmp_path, column + ".npy"), getattr(chunk, column))
+        np.save(
+            os.path.join(tmp_path, BYTE_OFFSETS_COLUMN + ".npy"),
+            np.frombuffer(byte_offsets, dtype=np.int64),
+        )
+        manifest = {
+            "version": STORE_VERSION,
+            "source": signature,
+            "frames": len(chunk),
+            "objects": int(chunk.offsets[-1]),
+        }
+        with open(os.path.join(tmp_path, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f)
+        _publish(tmp_path, store_path, json_path)
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return store_path
+
+
+def _publish(tmp_path, store_path, json_path, attempts=3):
+    """Rename a finished store directory to store_path.
+
+    An outdated store in the way is renamed aside and deleted, so readers
+    always see either the old or the new store. If another process has
+    published an up-to-date store meanwhile, that one is kept.
+    """
+    parent = os.path.dirname(os.path.abspath(store_path))
+    for _ in range(attempts):
+        try:
+            os.replace(tmp_path, store_path)
+            return
+        except OSError:
+            if not os.path.isdir(store_path):
+                raise
+            if not is_stale(json_path, store_path):
+                return
+        old_path = tempfile.mkdtemp(
+            prefix=os.path.basename(store_path) + ".old-", dir=parent
+        )
+        try:
+            os.replace(store_path, old_path)
+        except FileNotFoundError:
+            pass
+        shutil.rmtree(old_path, ignore_errors=True)
+    os.replace(tmp_path, store_path)
+
+
+def load(json_path, store_path=None):
+    """Return the DetectionStore for json_path, ingesting it if needed.
+
+    Opened stores are kept per process and reused until the source JSON
+    changes on disk.
+
+    :param json_path: Path to the detection JSON file.
+    :param store_path: Store directory, defaults to default_store_path().
+    :return: A memory-mapped DetectionStore.
+    """
+    store_path = os.path.abspath(store_path or default_store_path(json_path))
+    if is_stale(json_path, store_path):
+        ingest(json_path, store_path)
+        _open_stores.pop(store_path, None)
+
+    manifest = _read_manifest(store_path)
+    cached = _open_stores.get(store_path)
+    if cached is not None and cached[0] == manifest:
+        return cached[1]
+
+    store = DetectionStore(store_path, json_path)
+    _open_stores[store_path] = (manifest, store)
+    return store
+
+
+class FrameIndex:
+    """Lookup table from frame_index values to frame positions.
+
+    Built once per data load. Supports O(1) lookup of a single frame and
+    range selection by binary search, and copes with sparse, duplicated
+    or out-of-order frame indices.
+    """
+
+    def __init__(self, frame_index):
+        frame_index = np.asarray(frame_index, dtype=np.int64)
+        self._order = np.argsort(frame_index, kind="stable")
+        self._sorted = frame_index[self._order]
+        # First position of every frame index (stable sort keeps file order
+        # among duplicates, so the first sorted hit is the first occurrence).
+        unique, first = np.unique(self._sorted, return_index=True)
+        self._positions = dict(zip(unique.tolist(), self._order[first].tolist()))
+
+    def __len__(self):
+        return len(self._sorted)
+
+    def position(self, frame_index):
+        """Return the position of the first frame with frame_index, or None."""
+        return self._positions.get(frame_index)
+
+    def range(self, start, stop):
+        """Return the positions of frames with start <= frame_index < stop.
+
+        Positions are ordered by frame index (file order among duplicates).
+        For a store written in frame order this is a contiguous run.
+
+        :param start: First frame index (inclusive).
+        :param stop: Last frame index (exclusive).
+        :return: Array of frame positions.
+        """
+        lo, hi = np.searchsorted(self._sorted, [start, stop], side="left")
+        return self._order[lo:hi]
+
+
+class _ColumnBuilder:
+    """Accumulates frame dicts into compact growable column buffers."""
+
+    def __init__(self):
+        self.frame_index = array("q")
+        self.offsets = array("q", [0])
+        self.centers = array("d")
+        self.confidence = array("f")
+        self.team_index = array("i")
+        self.source = array("b")
+
+    def add(self, frame):
+        self.frame_index.append(int(frame["frame_index"]))
+        objects = frame.get("objects", [])
+        self.offsets.append(self.offsets[-1] + len(objects))
+        for obj in objects:
+            self.centers.extend(obj["transformed_center"])
+            self.confidence.append(obj["confidence"])
+            self.team_index.append(int(obj.get("team_index", -1)))
+            self.source.append(source_code(obj.get("source")))
+
+    def build(self):
+        centers = np.frombuffer(self.centers, dtype=np.float64).reshape(-1, 2).copy()
+        source = np.frombuffer(self.source, dtype=np.int8).copy()
+        return DetectionChunk(
+            np.frombuffer(self.frame_index, dtype=np.int64).copy(),
+            np.frombuffer(self.offsets, dtype=np.int64).copy(),
+            centers,
+            np.frombuffer(self.confidence, dtype=np.float32).copy(),
+            np.frombuffer(self.team_index, dtype=np.int32).copy(),
+            source,
+            compute_global_x(centers, source),
+        )
+
+
+class DetectionChunk:
+    """A run of frames with their detections held as flat column arrays.
+
+    Objects of frame ``i`` live in rows ``offsets[i]:offsets[i + 1]`` of the
+    per-object columns. The columns are read-only views, so a chunk can be
+    shared freely; derived chunks (take, with_objects) never modify it.
+    """
+
+    def __init__(
+        self,
+        frame_index,
+        offsets,
+        centers,
+        confidence,
+        team_index,
+        source,
+        global_x=None,
+    ):
+        self.frame_index = _readonly(frame_index)  # (F,) int64
+        self.offsets = _readonly(offsets)  # (F + 1,) int64
+        self.centers = _readonly(centers)  # (N, 2) float64, transformed_center
+        self.confidence = _readonly(confidence)  # (N,) float32
+        self.team_index = _readonly(team_index)  # (N,) int32
+        self.source = _readonly(source)  # (N,) int8, see SOURCE_CODES
+        if global_x is None:
+            global_x = compute_global_x(centers, source)
+        # (N,) float64, x in the combined top-down view (right shifted)
+        self.global_x = _readonly(global_x)
+        self._index = None
+
+    def __len__(self):
+        return len(self.frame_index)
+
+    @classmethod
+    def from_frames(cls, frames):
+        """Build a chunk from an iterable of frame detection dictionaries."""
+        builder = _ColumnBuilder()
+        for frame in frames:
+            builder.add(frame)
+        return builder.build()
+
+    def rows(self, pos):
+        """Return the row slice holding the objects of frame ``pos``."""
+        return slice(int(self.offsets[pos]), int(self.offsets[pos + 1]))
+
+    @property
+    def index(self):
+        """The FrameIndex of this chunk, built on first access."""
+        if self._index is None:
+            self._index = FrameIndex(self.frame_index)
+        return self._index
+
+    def position(self, frame_index):
+        """Return the position of the first frame with frame_index, or None."""
+        return self.index.position(frame_index)
+
+    def take(self, positions):
+        """Return a new chunk containing the frames at ``positions``, in order.
+
+        A contiguous run of positions is returned as views on the
+        underlying arrays; anything else is gathered into copies.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        if len(positions) == 0:
+            return self._slice(0, 0)
+        start, stop = int(positions[0]), int(positions[-1]) + 1
+        if stop - start == len(positions) and np.all(np.diff(positions) == 1):
+            return self._slice(start, stop)
+
+        starts = self.offsets[positions]
+        lengths = self.offsets[positions + 1] - starts
+        offsets = np.zeros(len(positions) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        rows = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return DetectionChunk(
+            np.asarray(self.frame_index[positions]),
+            offsets,
+            np.asarray(self.centers[rows]),
+            np.asarray(self.confidence[rows]),
+            np.asarray(self.team_index[rows]),
+            np.asarray(self.source[rows]),
+            np.asarray(self.global_x[rows]),
+        )
+
+    def select(self, keep):
+        """Return a new chunk with only the objects where ``keep`` is True.
+
+        All frames are kept, frames may end up without objects.
+
+        :param keep: (N,) boolean mask over the object rows.
+        """
+        keep = np.asarray(keep, dtype=bool)
+        kept_before = np.zeros(len(keep) + 1, dtype=np.int64)
+        np.cumsum(keep, out=kept_before[1:])
+        return DetectionChunk(
+            self.frame_index,
+            kept_before[self.offsets],
+            np.asarray(self.centers[keep]),
+            np.asarray(self.confidence[keep]),
+            np.asarray(self.team_index[keep]),
+            np.asarray(self.source[keep]),
+            np.asarray(self.global_x[keep]),
+        )
+
+    def _slice(self, start, stop):
+        lo, hi = int(self.offsets[start]), int(self.offsets[stop])
+        return DetectionChunk(
+            self.frame_index[start:stop],
+            np.asarray(self.offsets[start : stop + 1]) - lo,
+            self.centers[lo:hi],
+            self.confidence[lo:hi],
+            self.team_index[lo:hi],
+            self.source[lo:hi],
+            self.global_x[lo:hi],
+        )
+
+    def with_objects(self, pos, centers, confidence, team_index, source):
+        """Return a copy of the chunk with extra objects appended to frame pos.
+
+        :param pos: Frame position that receives the new objects.
+        :param centers: (K, 2) transformed centers of the new objects.
+        :param confidence: K confidences.
+        :param team_index: K team indices.
+        :param source: K source codes.
+        """
+        row = int(self.offsets[pos + 1])
+        count = len(confidence)
+        offsets = np.array(self.offsets, dtype=np.int64)
+        offsets[pos + 1 :] += count
+        centers = np.reshape(centers, (-1, 2))
+        return DetectionChunk(
+            self.frame_index,
+            offsets,
+            np.insert(self.centers, row, centers, axis=0),
+            np.insert(self.confidence, row, confidence),
+            np.insert(self.team_index, row, team_index),
+            np.insert(self.source, row, source),
+            np.insert(self.global_x, row, compute_global_x(centers, source)),
+        )
+
+
+class DetectionStore(DetectionChunk):
+    """Memory-mapped view of an ingested detection file."""
+
+    def __init__(self, store_path, json_path=None):
+        self.path = store_path
+        self.json_path = json_path
+        self.manifest = _read_manifest(store_path)
+        super().__init__(**{column: self._load(column) for column in _COLUMNS})
+        self.byte_offsets = self._load(BYTE_OFFSETS_COLUMN)
+
+    def _load(self, column):
+        path = os.path.join(self.path, column + ".npy")
+        try:
+            return np.load(path, mmap_mode="r")
+        except ValueError:
+            # Empty columns cannot be memory-mapped.
+            return np.load(path)
+
+    def frame_range(self, start, stop):
+        """Return the frames with start <= frame_index < stop as a chunk.
+
+        :param start: First frame index (inclusive).
+        :param stop: Last frame index (exclusive).
+        :return: A DetectionChunk ordered by frame index.
+        """
+        return self.take(self.index.range(start, stop))
+
+    def iter_json_frames(self, start_frame):
+        """Stream the source JSON frames from start_frame onwards.
+
+        Seeks directly to the frame's recorded byte offset, so nothing
+        before it is read or parsed.
+
+        :param start_frame: Frame index to start at.
+        :return: Iterator over frame dicts in file order.
+        """
+        pos = self.position(start_frame)
+        if pos is None:
+            raise ValueError(f"Frame {start_frame} not found in {self.json_path}")
+        return iter_frames(self.json_path, offset=int(self.byte_offsets[pos]))
@@ -0,0 +1,131 @@
+"""Compact, queryable log of tracking events.
+
+The tracking loop records "put" (an internal id is given to a track),
+"lost" (a track stops being updated) and "lost_long" (a track has been
+lost for more than a second) events here instead of printing them. Events
+are kept in flat typed columns, and an event below the log's level is not
+recorded at all, so a disabled log costs one comparison per event site.
+"""
+
+import logging
+from array import array
+
+import numpy as np
+
+PUT = 0
+LOST = 1
+LOST_LONG = 2
+
+EVENT_NAMES = ("put", "lost", "lost_long")
+EVENT_CODES = {name: code for code, name in enumerate(EVENT_NAMES)}
+# Level of each event type, using the standard logging levels
+EVENT_LEVELS = (logging.DEBUG, logging.INFO, logging.INFO)
+
+DISABLED = logging.CRITICAL + 10  # Level at which no event is recorded
+
+
+def parse_level(level):
+    """Convert a level name ("debug", "info", ...) or number to a number.
+
+    :param level: Level name (case-insensitive), number, or None for
+        DISABLED.
+    :return: The numeric level.
+    """
+    if level is None:
+        return DISABLED
+    if isinstance(level, str):
+        value = logging.getLevelName(level.upper())
+        if not isinstance(value, int):
+            raise ValueError(f"Unknown log level {level!r}")
+        return value
+    return int(level)
+
+
+class EventLog:
+    """Level-gated event log with columnar storage.
+
+    :param level: Lowest level recorded, as a number or name (see
+        parse_level). Defaults to recording nothing.
+    """
+
+    def __init__(self, level=None):
+        self.level = parse_level(level)
+        self._frame = array("q")
+        self._event = array("b")
+        self._internal_id = array("q")
+        self._external_id = array("q")
+        self._distance = array("d")
+
+    def __len__(self):
+        return len(self._frame)
+
+    def enabled(self, event):
+        """Whether events of the given type are recorded."""
+        return EVENT_LEVELS[event] >= self.level
+
+    def record(self, frame, event, internal_id, external_id=-1, distance=np.nan):
+        """Record an event (callers check enabled(event) first).
+
+        :param frame: Frame index the event happened at.
+        :param event: Event type (PUT, LOST or LOST_LONG).
+        :param internal_id: Internal track id.
+        :param external_id: ByteTrack track id, -1 if not known.
+        :param distance: Re-acquisition distance for PUT events, else NaN.
+        """
+        self._frame.append(frame)
+        self._event.append(event)
+        self._internal_id.append(internal_id)
+        self._external_id.append(external_id)
+        self._distance.append(distance)
+
+    def to_array(self):
+        """Return all events as a NumPy structured array."""
+        events = np.empty(
+            len(self),
+            dtype=[
+                ("frame", np.int64),
+                ("event", np.int8),
+                ("internal_id", np.int64),
+                ("external_id", np.int64),
+                ("distance", np.float64),
+            ],
+        )
+        events["frame"] = self._frame
+        events["event"] = self._event
+        events["internal_id"] = self._internal_id
+        events["external_id"] = self._external_id
+        events["distance"] = self._distance
+        return events
+
+    def query(self, event=None, internal_id=None, start=None, stop=None):
+        """Select events as JSON-serializable dicts.
+
+        :param event: Only events of this type (code or name).
+        :param internal_id: Only events of this internal id.
+        :param start: Only events at or after this frame index.
+        :param stop: Only events before this frame index.
+        :return: List of {"frame", "event", "internal_id", "external_id",
+            "distance"} dicts, in recording order. distance is None when
+            not applicable.
+        """
+        events = self.to_array()
+        mask = np.ones(len(events), dtype=bool)
+        if event is not None:
+            mask &= events["event"] == EVENT_CODES.get(event, event)
+        if internal_id is not None:
+            mask &= events["internal_id"] == internal_id
+        if start is not None:
+            mask &= events["frame"] >= start
+        if stop is not None:
+            mask &= events["frame"] < stop
+
+        return [
+            {
+                "frame": frame,
+                "event": EVENT_NAMES[code],
+                "internal_id": track_id,
+                "external_id": external_id,
+                "distance": None if np.isnan(distance) else distance,
+            }
+            for frame, code, track_id, external_id, distance in events[mask].tolist()
+        ]
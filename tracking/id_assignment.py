@@ -0,0 +1,135 @@
+"""Assignment of internal ids to tracks and start-frame objects.
+
+All new tracks of a frame are matched against all free internal ids at
+once with a linear-sum (Hungarian) assignment, so the result no longer
+depends on the order in which ByteTrack reports the tracks. Operator
+supplied coordinates are matched to start-frame objects through a
+KD-tree.
+"""
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from scipy.spatial import cKDTree
+
+MAX_MATCH_DISTANCE = 28  # Threshold for matching distance, in top-down pixels
+START_MATCH_TOLERANCE = 1e-2  # Tolerance for matching coords to start objects
+
+# Stands in for "not allowed" so that the assignment always has a solution;
+# any pair that ends up with this cost is dropped afterwards.
+_INFEASIBLE = 1e9
+
+
+def assignment_costs(
+    centers,
+    class_ids,
+    free_ids,
+    tracks,
+    forced_ids=None,
+    max_distance=MAX_MATCH_DISTANCE,
+):
+    """Build the new-track x free-id cost matrix.
+
+    A free id that was used before can only be taken by a track of the same
+    class; its cost is the distance to the id's last known center. A free id
+    that was never used costs 0, unless the track has a forced id, in which
+    case only that id is allowed. Costs above max_distance are infeasible.
+
+    :param centers: (K, 2) centers of the new tracks.
+    :param class_ids: K class ids of the new tracks.
+    :param free_ids: Candidate internal ids.
+    :param tracks: The run's TrackTable (last center and class of every id
+        used so far).
+    :param forced_ids: Optional list of K forced internal ids (or None).
+    :param max_distance: Distance gate for re-acquiring a used id.
+    :return: (K, len(free_ids)) float array, _INFEASIBLE where not allowed.
+    """
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+    class_ids = np.asarray(class_ids)
+    free_ids = np.asarray(free_ids, dtype=np.int64)
+    costs = np.zeros((len(centers), len(free_ids)), dtype=np.float64)
+
+    used = tracks.used[free_ids]
+    if used.any():
+        used_ids = free_ids[used]
+        prev_centers = tracks.center[used_ids]
+        prev_classes = tracks.cls_id[used_ids]
+        deltas = centers[:, None, :] - prev_centers[None, :, :]
+        distances = np.sqrt(deltas[..., 0] ** 2 + deltas[..., 1] ** 2)
+        distances[class_ids[:, None] != prev_classes[None, :]] = _INFEASIBLE
+        costs[:, used] = distances
+
+    if forced_ids is not None:
+        # For detections in the start frame, only the forced id is allowed
+        for row, forced_id in enumerate(forced_ids):
+            if forced_id is not None:
+                costs[row, ~used & (free_ids != forced_id)] = _INFEASIBLE
+
+    costs[costs > max_distance] = _INFEASIBLE
+    return costs
+
+
+def assign_new_tracks(
+    centers,
+    class_ids,
+    free_ids,
+    tracks,
+    forced_ids=None,
+    max_distance=MAX_MATCH_DISTANCE,
+):
+    """Match new tracks to free internal ids with minimum total distance.
+
+    :param centers: (K, 2) centers of the new tracks.
+    :param class_ids: K class ids of the new tracks.
+    :param free_ids: Candidate internal ids.
+    :param tracks: The run's TrackTable (last center and class of every id
+        used so far).
+    :param forced_ids: Optional list of K forced internal ids (or None).
+    :param max_distance: Distance gate for re-acquiring a used id.
+    :return: List of (row, internal_id, distance), ordered by row. Rows
+        without a feasible id are left out.
+    """
+    free_ids = list(free_ids)
+    if len(centers) == 0 or not free_ids:
+        return []
+
+    costs = assignment_costs(
+        centers, class_ids, free_ids, tracks, forced_ids, max_distance
+    )
+    rows, cols = linear_sum_assignment(costs)
+    return [
+        (int(row), free_ids[col], float(costs[row, col]))
+        for row, col in zip(rows, cols)
+        if costs[row, col] < _INFEASIBLE
+    ]
+
+
+def match_coordinates(centers, coords, atol=START_MATCH_TOLERANCE):
+    """Find, for every requested coordinate, the first object at that position.
+
+    A coordinate matches an object when np.allclose(center, coord, atol=atol)
+    holds. All coordinates are matched in one query against a KD-tree built
+    over the object centers instead of comparing every pair.
+
+    :param centers: (N, 2) object centers (e.g. the start frame's
+        transformed_center values).
+    :param coords: (M, 2) requested coordinates.
+    :param atol: Absolute tolerance, as for np.allclose.
+    :return: (M,) array with the lowest matching object index, -1 if none.
+    """
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    matches = np.full(len(coords), -1, dtype=np.int64)
+    if len(centers) == 0 or len(coords) == 0:
+        return matches
+
+    # np.allclose also allows a relative error of rtol * |coord| per axis,
+    # so search a slightly larger box and confirm candidates exactly.
+    rtol = 1e-5
+    radius = atol + rtol * np.abs(coords).max(axis=1)
+    candidates = cKDTree(centers).query_ball_point(coords, radius, p=np.inf)
+    for row, indices in enumerate(candidates):
+        for idx in sorted(indices):
+            if np.allclose(centers[idx], coords[row], atol=atol, rtol=rtol):
+                matches[row] = idx
+                break
+    return matches
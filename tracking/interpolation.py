@@ -0,0 +1,162 @@
+"""Gap filling of tracked positions.
+
+The tracking loop only records the positions it observes. Every track is
+still output in every frame from its first observation on; fill_gaps()
+adds the missing positions afterwards, one vectorized pass per track:
+gaps of up to max_gap frames between two observations are interpolated
+linearly (constant velocity between both ends), longer gaps and the frames
+after a track's last observation hold its last observed position.
+GapFiller does the same for frames arriving one at a time, holding back
+only the frames whose gaps are still open.
+"""
+
+import numpy as np
+
+# Frames GapFiller collects (beyond max_gap) before filling them in one go
+FILL_BLOCK = 60
+
+
+def fill_gaps(records, n_frames, max_gap, start=0, order=None):
+    """Complete observed track records with filled gap positions.
+
+    :param records: (M, 5) observed (frame position, track id, class id,
+        x, y) rows, ordered by frame position, at most one per track and
+        frame.
+    :param n_frames: Number of frames; tracks are output up to position
+        n_frames - 1.
+    :param max_gap: Longest gap, in frames, that is interpolated. 0 holds
+        the last position in every gap.
+    :param start: First frame position output. Rows before it only serve
+        as anchors for the frames from start on.
+    :param order: Track ids in order of first use, defaults to the order of
+        first appearance in records. In every frame the filled rows follow
+        the observed ones, in this order.
+    :return: (M', 5) array of observed and filled rows from start on,
+        ordered by frame position.
+    """
+    records = np.asarray(records, dtype=np.float64).reshape(-1, 5)
+    frames = records[:, 0].astype(np.int64)
+    ids = records[:, 1].astype(np.int64)
+    if order is None:
+        unique_ids, first = np.unique(ids, return_index=True)
+        order = unique_ids[np.argsort(first, kind="stable")]
+
+    parts = [records]
+    ranks = [np.arange(len(records))]  # Observed rows keep their own order
+    filled = [np.zeros(len(records), dtype=bool)]
+    for rank, track_id in enumerate(np.asarray(order).tolist()):
+        rows = np.flatnonzero(ids == track_id)
+        if not len(rows):
+            continue
+        seen = frames[rows]
+        missing = np.setdiff1d(
+            np.arange(max(seen[0], start), n_frames), seen, assume_unique=True
+        )
+        if not len(missing):
+            continue
+
+        # Last observation before, and gap length around, every missing frame
+        prev = np.searchsorted(seen, missing) - 1
+        bounded = prev + 1 < len(seen)
+        gap = np.where(
+            bounded,
+            seen[np.minimum(prev + 1, len(seen) - 1)] - seen[prev] - 1,
+            n_frames,
+        )
+        interpolate = bounded & (gap <= max_gap)
+
+        part = records[rows[prev]].copy()  # Holds the last observation
+        part[:, 0] = missing
+        if interpolate.any():
+            for column in (3, 4):
+                part[interpolate, column] = np.interp(
+                    missing[interpolate], seen, records[rows, column]
+                )
+        parts.append(part)
+        ranks.append(np.full(len(part), rank))
+        filled.append(np.ones(len(part), dtype=bool))
+
+    result = np.concatenate(parts)
+    order = np.lexsort((np.concatenate(ranks), np.concatenate(filled), result[:, 0]))
+    result = result[order]
+    return result[result[:, 0] >= start]
+
+
+class GapFiller:
+    """Incremental fill_gaps() over frames arriving one at a time.
+
+    A frame is filled and released once max_gap further frames have been
+    added (or on flush()): by then every gap covering it is either closed
+    or known to be too long for interpolation.
+
+    :param max_gap: Longest gap, in frames, that is interpolated.
+    :param anchors: Optional (K, 5) rows at frame position -1, e.g. the last
+        positions of a resumed tracker state, in order of first use.
+    :param block: Frames collected beyond max_gap before filling.
+    """
+
+    def __init__(self, max_gap, anchors=None, block=FILL_BLOCK):
+        self.max_gap = max_gap
+        self.block = block
+        self.offset = 0  # Frame position of the first pending frame
+        self.frame_indices = []  # Pending frames
+        self.records = []  # Observed rows of the pending frames
+        self.anchors = {}  # {track id: last observed row before offset}
+        self.order = []  # Track ids in order of first use
+        if anchors is not None:
+            for row in np.asarray(anchors, dtype=np.float64).reshape(-1, 5):
+                self.anchors[int(row[1])] = tuple(row.tolist())
+                self.order.append(int(row[1]))
+        self._known = set(self.order)
+
+    def add(self, frame_index, frame_records):
+        """Add a tracked frame.
+
+        :param frame_index: Frame index.
+        :param frame_records: Observed (track id, class id, x, y) tuples.
+        :return: List of (frame_index, records) for the frames released,
+            records being a (K, 4) array of (track id, class id, x, y).
+        """
+        pos = self.offset + len(self.frame_indices)
+        self.frame_indices.append(frame_index)
+        for record in frame_records:
+            self.records.append((pos, *record))
+            track_id = int(record[0])
+            if track_id not in self._known:
+                self._known.add(track_id)
+                self.order.append(track_id)
+        if len(self.frame_indices) < self.max_gap + self.block:
+            return []
+        return self._release(len(self.frame_indices) - self.max_gap)
+
+    def flush(self):
+        """Release all pending frames, see add()."""
+        return self._release(len(self.frame_indices))
+
+    def _release(self, count):
+        end = self.offset + len(self.frame_indices)
+        rows = fill_gaps(
+            list(self.anchors.values()) + self.records,
+            end,
+            self.max_gap,
+            start=self.offset,
+            order=self.order,
+        )
+        stop = self.offset + count
+        rows = rows[rows[:, 0] < stop]
+        bounds = np.searchsorted(rows[:, 0], np.arange(self.offset, stop + 1))
+        released = [
+            (frame_index, rows[bounds[pos] : bounds[pos + 1], 1:])
+            for pos, frame_index in enumerate(self.frame_indices[:count])
+        ]
+
+        pending = []
+        for row in self.records:
+            if row[0] < stop:
+                self.anchors[int(row[1])] = row
+            else:
+                pending.append(row)
+        self.records = pending
+        self.frame_indices = self.frame_indices[count:]
+        self.offset = stop
+        return released
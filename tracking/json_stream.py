@@ -0,0 +1,169 @@
+"""Incremental reader for large frame JSON files.
+
+radon.json (a top-level list of frames) and the overlay JSON (an object
+with a "frames" list next to its "metadata") can be several gigabytes for
+a full match. FrameReader parses them one frame at a time from a bounded
+buffer instead of materializing the whole document with json.load, and
+reports the byte offset of every frame so a later read can seek straight
+to it.
+"""
+
+import codecs
+import json
+
+READ_SIZE = 1 << 20  # Bytes read from the file per refill
+
+_WHITESPACE = " \t\n\r"
+
+
+class _Scanner:
+    """Bounded text buffer over a binary file that tracks byte offsets."""
+
+    def __init__(self, f, offset):
+        self._file = f
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._ascii = True  # Whether _buf is pure ASCII (1 char == 1 byte)
+        self._offset = offset  # Byte offset of _buf[_pos] in the file
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._eof = False
+
+    @property
+    def offset(self):
+        return self._offset
+
+    def _fill(self):
+        data = self._file.read(READ_SIZE)
+        # The incremental decoder keeps UTF-8 sequences split across reads.
+        text = self._utf8.decode(data, final=not data)
+        if not data:
+            self._eof = True
+            return False
+
+        # Drop the consumed prefix to keep the buffer bounded.
+        self._buf = self._buf[self._pos :] + text
+        self._pos = 0
+        self._ascii = self._buf.isascii()
+        return True
+
+    def _advance(self, end):
+        if self._ascii:
+            self._offset += end - self._pos
+        else:
+            self._offset += len(self._buf[self._pos : end].encode("utf-8"))
+        self._pos = end
+
+    def peek(self):
+        """Skip whitespace and return the next character ('' at EOF)."""
+        while True:
+            end = self._pos
+            while end < len(self._buf) and self._buf[end] in _WHITESPACE:
+                end += 1
+            self._advance(end)
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars):
+        """Consume the next non-whitespace character, which must be in chars."""
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(
+                f"Expected one of {chars!r} at byte {self._offset}, got {char!r}"
+            )
+        self._advance(self._pos + 1)
+        return char
+
+    def decode(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                # A value running up to the end of the buffer (e.g. a number)
+                # may continue in the next read.
+                if end < len(self._buf) or self._eof:
+                    self._advance(end)
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+
+class FrameReader:
+    """Iterate over the frames of a JSON file with bounded memory.
+
+    :param path: Path to the JSON file.
+    :param frames_key: None if the document is a list of frames; otherwise
+        the key of the frames list inside the top-level object. The other
+        top-level members are collected into ``metadata``.
+    :param offset: Optional byte offset of a frame (as reported by
+        iteration) to start reading from. Only valid for frames_key=None.
+    """
+
+    def __init__(self, path, frames_key=None, offset=None):
+        if offset is not None and frames_key is not None:
+            raise ValueError("offset is only supported for top-level frame lists")
+        self.path = path
+        self.frames_key = frames_key
+        self.offset = offset
+        self.metadata = {}
+
+    def __iter__(self):
+        for _, frame in self.iter_with_offsets():
+            yield frame
+
+    def iter_with_offsets(self):
+        """Yield (byte offset, frame) pairs in file order."""
+        with open(self.path, "rb") as f:
+            if self.offset is not None:
+                f.seek(self.offset)
+                scanner = _Scanner(f, self.offset)
+                yield from self._iter_items(scanner, started=True)
+                return
+
+            scanner = _Scanner(f, 0)
+            if self.frames_key is None:
+                scanner.expect("[")
+                yield from self._iter_items(scanner)
+                return
+
+            scanner.expect("{")
+            if scanner.peek() == "}":
+                return
+            while True:
+                key = scanner.decode()
+                scanner.expect(":")
+                if key == self.frames_key and scanner.peek() == "[":
+                    scanner.expect("[")
+                    yield from self._iter_items(scanner)
+                else:
+                    self.metadata[key] = scanner.decode()
+                if scanner.expect(",}") == "}":
+                    return
+
+    @staticmethod
+    def _iter_items(scanner, started=False):
+        # Positioned after "[" (or at an item, when started from an offset).
+        if not started and scanner.peek() == "]":
+            scanner.expect("]")
+            return
+        while True:
+            scanner.peek()
+            offset = scanner.offset
+            yield offset, scanner.decode()
+            if scanner.expect(",]") == "]":
+                return
+
+
+def iter_frames(path, frames_key=None, offset=None):
+    """Yield the frames of a JSON file one at a time.
+
+    :param path: Path to the JSON file.
+    :param frames_key: Key of the frames list for object documents.
+    :param offset: Byte offset of the first frame to read.
+    """
+    return iter(FrameReader(path, frames_key=frames_key, offset=offset))
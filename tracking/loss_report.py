@@ -0,0 +1,101 @@
+"""Loss events and re-link candidates of a tracking run.
+
+A LossReport passed to the tracking loop switches it to holding lost
+tracks: once a track has been lost for longer than lost_report_frames,
+its id is held, i.e. never handed out to another track again. The loss is
+recorded with its frame, and every later new track of the same class that
+appears near a held id's last position is recorded as a candidate for
+re-linking to it. Every held id adds a spare id above max_allowed_id, so
+new tracks are still tracked; new tracks that get no id anyway are counted
+as untracked. Combined with stop_on_loss=False, one run yields all losses
+of a chunk so an operator can correct them in a single batch.
+"""
+
+from tracking.transform_utility import reverse_transform_points
+
+
+class LossReport:
+    """Collects the losses and re-link candidates of one tracking run."""
+
+    def __init__(self):
+        self._losses = []  # (frame, [internal ids])
+        self._relinks = []  # (frame, lost id, internal id, distance, center)
+        self._checked_tracks = set()  # ByteTrack ids already checked for re-links
+        self._untracked_frames = set()  # Frames with a new track left without an id
+        self._untracked_tracks = set()  # ByteTrack ids of those tracks
+
+    def __len__(self):
+        return len(self._losses)
+
+    def record_loss(self, frame, internal_ids):
+        """Record ids that became lost (and held) at a frame."""
+        self._losses.append((frame, list(internal_ids)))
+
+    def check_track(self, external_id):
+        """Return True the first time a ByteTrack id is passed, else False."""
+        if external_id in self._checked_tracks:
+            return False
+        self._checked_tracks.add(external_id)
+        return True
+
+    def record_relink(self, frame, lost_id, internal_id, distance, center):
+        """Record a new track that may be the reappearance of a held id.
+
+        :param frame: Frame index the new track appeared at.
+        :param lost_id: The held internal id.
+        :param internal_id: Internal id the new track was given, None if it
+            did not get one.
+        :param distance: Distance to the held id's last center, in top-down
+            pixels.
+        :param center: Top-down center of the new track.
+        """
+        self._relinks.append((frame, lost_id, internal_id, distance, center))
+
+    def record_untracked(self, frame, external_ids):
+        """Record new tracks that got no internal id at a frame.
+
+        :param frame: Frame index.
+        :param external_ids: ByteTrack ids of the tracks left without an id.
+        """
+        self._untracked_frames.add(frame)
+        self._untracked_tracks.update(external_ids)
+
+    def untracked(self):
+        """Return how many new tracks were left without an internal id.
+
+        :return: {"frames", "tracks"}: the number of frames with such a track
+            and the number of distinct tracks.
+        """
+        return {
+            "frames": len(self._untracked_frames),
+            "tracks": len(self._untracked_tracks),
+        }
+
+    def losses(self):
+        """Return the losses as [{"frame", "ids"}], in frame order."""
+        return [{"frame": frame, "ids": ids} for frame, ids in self._losses]
+
+    def relink_candidates(self):
+        """Return the re-link candidates, in frame order.
+
+        :return: List of {"frame", "lost_id", "id", "distance", "c", "src"}
+            dicts; "c" and "src" give the new track's position as in the
+            tracking output, so a candidate can be confirmed by sending
+            {"id": lost_id, "c": c, "src": src} as an update at "frame".
+        """
+        is_right, centers = reverse_transform_points(
+            [center for *_, center in self._relinks]
+        )
+        return [
+            {
+                "frame": frame,
+                "lost_id": lost_id,
+                "id": internal_id,
+                "distance": distance,
+                "c": [round(x, 1), round(y, 1)],
+                "src": 1 if right else 0,
+            }
+            for (frame, lost_id, internal_id, distance, _), (x, y), right in zip(
+                self._relinks, centers.tolist(), is_right.tolist()
+            )
+        ]
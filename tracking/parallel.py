@@ -0,0 +1,322 @@
+"""Parallel full-match tracking.
+
+The match is split into CHUNK_LENGTH windows. Every window is tracked in a
+ProcessPoolExecutor worker, starting OVERLAP_LENGTH frames early so its
+tracks are already warm when its own frames begin. Neighbouring windows
+are then stitched by matching observed track positions in that overlap
+region, so ids stay consistent across window boundaries; a track that
+starts in a window only takes over an earlier id if that id was last seen
+close to where the track begins. Gaps are filled once all windows are
+stitched.
+
+Usage: python -m tracking.parallel <detections.json> <output.json> [workers]
+"""
+
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from tracking import detection_store
+from tracking.config import DEFAULT_CONFIG
+from tracking.id_assignment import MAX_MATCH_DISTANCE
+from tracking.interpolation import fill_gaps
+from tracking.tracker import (
+    CHUNK_LENGTH,
+    DETECTIONS_PATH,
+    track_chunk,
+    write_tracking_json,
+)
+
+OVERLAP_LENGTH = 120  # Warm-up frames shared with the previous window
+
+
+def plan_windows(frames, chunk_length=CHUNK_LENGTH, overlap=OVERLAP_LENGTH):
+    """Split sorted frame indices into overlapping tracking windows.
+
+    :param frames: Sorted, unique frame indices of the match.
+    :param chunk_length: Number of frames each window outputs.
+    :param overlap: Number of warm-up frames taken from the previous window.
+    :return: List of (warm_start, start, stop) frame index triples; a
+        window tracks [warm_start, stop) and outputs [start, stop).
+    """
+    frames = np.asarray(frames)
+    windows = []
+    for first in range(0, len(frames), chunk_length):
+        warm = max(0, first - overlap)
+        last = min(first + chunk_length, len(frames)) - 1
+        windows.append((int(frames[warm]), int(frames[first]), int(frames[last]) + 1))
+    return windows
+
+
+def _track_window(json_path, warm_start, stop, config=None):
+    # Runs in a worker process; the store is memory-mapped, not pickled.
+    store = detection_store.load(json_path)
+    chunk = store.frame_range(warm_start, stop)
+    _, _, frame_indices, records = track_chunk(
+        chunk, warm_start, {}, stop_on_loss=False, config=config, fill=False
+    )
+    return np.asarray(frame_indices, dtype=np.int64), records
+
+
+def _record_frames(frame_indices, records):
+    return frame_indices[records[:, 0].astype(np.int64)]
+
+
+def _positions(frames, ids, record_frames, records):
+    """(len(frames), len(ids), 2) track positions, NaN where a track is absent."""
+    positions = np.full((len(frames), len(ids), 2), np.nan)
+    if len(frames) == 0 or len(ids) == 0:
+        return positions
+    rows = np.searchsorted(frames, record_frames).clip(max=len(frames) - 1)
+    cols = np.searchsorted(ids, records[:, 1]).clip(max=len(ids) - 1)
+    present = (frames[rows] == record_frames) & (ids[cols] == records[:, 1])
+    positions[rows[present], cols[present]] = records[present, 3:5]
+    return positions
+
+
+def match_overlap(
+    prev_frames,
+    prev_records,
+    frame_indices,
+    records,
+    overlap_frames,
+    max_distance=MAX_MATCH_DISTANCE,
+):
+    """Map the ids of a window onto the ids of the previous window.
+
+    Tracks are compared by their mean distance over the overlap frames in
+    which both are present, and paired by a linear-sum assignment. Pairs
+    further apart than max_distance on average are not matched.
+
+    :param prev_frames: Frame index per record of the previous window.
+    :param prev_records: (M, 5) observed records of the previous window
+        (final ids).
+    :param frame_indices: Frame index per record of the current window.
+    :param records: (K, 5) observed records of the current window (window
+        ids).
+    :param overlap_frames: Sorted frame indices tracked by both windows.
+    :param max_distance: Mean distance gate for a match.
+    :return: {window id: previous window id} for the matched tracks.
+    """
+    prev_ids = np.unique(prev_records[:, 1])
+    ids = np.unique(records[:, 1])
+    prev_positions = _positions(overlap_frames, prev_ids, prev_frames, prev_records)
+    positions = _positions(overlap_frames, ids, frame_indices, records)
+
+    deltas = prev_positions[:, :, None, :] - positions[:, None, :, :]
+    distances = np.sqrt((deltas**2).sum(axis=-1))  # (frames, prev ids, ids)
+    common = (~np.isnan(distances)).sum(axis=0)
+    costs = np.nansum(distances, axis=0) / np.maximum(common, 1)
+    feasible = (common > 0) & (costs <= max_distance)
+    if not feasible.any():
+        return {}
+
+    costs[~feasible] = 1e9
+    rows, cols = linear_sum_assignment(costs)
+    return {
+        int(ids[col]): int(prev_ids[row])
+        for row, col in zip(rows, cols)
+        if feasible[row, col]
+    }
+
+
+def link_new_tracks(first_frames, first_positions, last_seen, max_distance):
+    """Pick earlier ids for tracks that did not continue a previous track.
+
+    A track may take over an id whose last observation precedes the
+    track's first one and lies within max_distance of it (the player
+    was lost and re-appeared). Tracks and ids are paired by a linear-sum
+    assignment on that distance.
+
+    :param first_frames: (T,) frame index of every track's first observation.
+    :param first_positions: (T, 2) position of that observation.
+    :param last_seen: {final id: (frame index, position)} of the last
+        observation of every id that is free to be taken over.
+    :param max_distance: Distance gate, in top-down pixels.
+    :return: {track position in first_frames: final id}.
+    """
+    if not len(first_frames) or not last_seen:
+        return {}
+    ids = list(last_seen)
+    last_frames = np.array([last_seen[final_id][0] for final_id in ids])
+    last_positions = np.array([last_seen[final_id][1] for final_id in ids])
+    distances = np.linalg.norm(
+        np.asarray(first_positions)[:, None] - last_positions[None], axis=2
+    )
+    feasible = (last_frames[None] < np.asarray(first_frames)[:, None]) & (
+        distances <= max_distance
+    )
+    if not feasible.any():
+        return {}
+    costs = np.where(feasible, distances, 1e9)
+    rows, cols = linear_sum_assignment(costs)
+    return {int(row): ids[col] for row, col in zip(rows, cols) if feasible[row, col]}
+
+
+def stitch_windows(
+    windows,
+    results,
+    max_distance=MAX_MATCH_DISTANCE,
+    max_gap=DEFAULT_CONFIG.max_gap_frames,
+):
+    """Combine per-window tracking results into one consistent track set.
+
+    Tracks continuing a track of the previous window in the overlap take
+    over its id (see match_overlap). Every other track takes over the id
+    of an earlier track that was last seen close to where it starts (see
+    link_new_tracks), or else gets an id no earlier window has used.
+
+    :param windows: (warm_start, start, stop) triples from plan_windows().
+    :param results: (frame_indices, records) per window from track_chunk,
+        with the observed rows only (fill=False).
+    :param max_distance: Distance gate for stitching two tracks.
+    :param max_gap: Longest gap that is interpolated, see fill_gaps().
+    :return: (frame_indices, records) covering the whole match, with gaps
+        filled.
+    """
+    # Output frames: every window's own frames, in order
+    output_frames = [
+        frame_indices[frame_indices >= start]
+        for (_, start, _), (frame_indices, _) in zip(windows, results)
+    ]
+    if not output_frames:
+        return np.empty(0, dtype=np.int64), np.empty((0, 5))
+    output_frames = np.concatenate(output_frames)
+
+    output = []  # Output records per window, with final ids
+    prev = None  # (record frames, records with final ids) of the last window
+    occupied = set()  # (frame index, final id) of the last window's output
+    last_seen = {}  # {final id: (frame index, position) of its last output row}
+    next_id = 1  # Lowest id no window has used so far
+    for (_, start, _), (frame_indices, records) in zip(windows, results):
+        record_frames = _record_frames(frame_indices, records)
+        own = record_frames >= start
+
+        fresh = set()  # Final ids first used by this window
+        if prev is None:
+            # The first window keeps its ids
+            mapping = {
+                track_id: track_id
+                for track_id in np.unique(records[:, 1]).astype(np.int64).tolist()
+            }
+        else:
+            overlap_frames = np.unique(frame_indices[frame_indices < start])
+            mapping = match_overlap(
+                prev[0], prev[1], record_frames, records, overlap_frames, max_distance
+            )
+            # Tracks with output rows that did not continue a previous one
+            new_ids = [
+                track_id
+                for track_id in np.unique(records[own, 1]).astype(np.int64).tolist()
+                if track_id not in mapping
+            ]
+            firsts = [int(np.argmax(records[:, 1] == track_id)) for track_id in new_ids]
+            taken = set(mapping.values())
+            linked = link_new_tracks(
+                record_frames[firsts],
+                records[firsts, 3:5],
+                {
+                    final_id: seen
+                    for final_id, seen in last_seen.items()
+                    if final_id not in taken
+                },
+                max_distance,
+            )
+            for index, track_id in enumerate(new_ids):
+                if index in linked:
+                    mapping[track_id] = linked[index]
+                else:
+                    mapping[track_id] = next_id
+                    fresh.add(next_id)
+                    next_id += 1
+        if mapping:
+            next_id = max(next_id, max(mapping.values()) + 1)
+
+        # Tracks only seen in the warm-up part are not output
+        mapped = np.isin(records[:, 1], list(mapping))
+        records = records[mapped].copy()
+        record_frames = record_frames[mapped]
+        own = own[mapped]
+        records[:, 1] = [mapping[int(track_id)] for track_id in records[:, 1]]
+
+        # Output the window's own frames. Warm-up rows of ids that existed
+        # before are output too where the previous window has no row for
+        # them, e.g. because it lost the track inside the overlap.
+        out = own.copy()
+        for row in np.flatnonzero(~own & ~np.isin(records[:, 1], list(fresh))):
+            key = (int(record_frames[row]), int(records[row, 1]))
+            out[row] = key[0] >= output_frames[0] and key not in occupied
+        out_records = records[out].copy()
+        out_frames = record_frames[out]
+        out_records[:, 0] = np.searchsorted(output_frames, out_frames)
+        order = np.argsort(out_frames, kind="stable")
+        for row, frame in zip(out_records[order], out_frames[order].tolist()):
+            last_seen[int(row[1])] = (frame, row[3:5])
+        occupied = set(
+            zip(record_frames[own].tolist(), records[own, 1].astype(np.int64).tolist())
+        )
+        output.append(out_records)
+        prev = (record_frames, records)
+
+    records = np.concatenate(output)
+    records = records[np.argsort(records[:, 0], kind="stable")]
+    return output_frames, fill_gaps(records, len(output_frames), max_gap)
+
+
+def track_match(
+    json_path=DETECTIONS_PATH,
+    chunk_length=CHUNK_LENGTH,
+    overlap=OVERLAP_LENGTH,
+    max_workers=None,
+    config=None,
+):
+    """Track a whole match with one worker process per window.
+
+    :param json_path: Detection JSON file (ingested into a store first).
+    :param chunk_length: Frames output per window.
+    :param overlap: Warm-up frames shared by neighbouring windows.
+    :param max_workers: Process pool size, defaults to the CPU count.
+    :param config: Optional TrackerConfig used by every window.
+    :return: (frame_indices, records) for the whole match, see track_chunk.
+    """
+    config = config or DEFAULT_CONFIG
+    # Ingest once up front so the workers only memory-map the store
+    store = detection_store.load(json_path)
+    frames = np.unique(store.frame_index)
+    windows = plan_windows(frames, chunk_length, overlap)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = list(
+            executor.map(
+                _track_window,
+                [json_path] * len(windows),
+                [warm_start for warm_start, _, _ in windows],
+                [stop for _, _, stop in windows],
+                [config] * len(windows),
+            )
+        )
+    return stitch_windows(
+        windows, results, config.max_match_distance, config.max_gap_frames
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4):
+        print(
+            "Usage: python -m tracking.parallel <detections.json> <output.json> [workers]"
+        )
+        sys.exit(1)
+
+    workers = int(sys.argv[3]) if len(sys.argv) == 4 else None
+    frame_indices, records = track_match(sys.argv[1], max_workers=workers)
+    with open(sys.argv[2], "w") as f:
+        write_tracking_json(
+            f,
+            frame_indices,
+            records[:, 0].astype(np.int64),
+            records[:, 1].astype(np.int64),
+            records[:, 2].astype(np.int64),
+            records[:, 3:],
+        )
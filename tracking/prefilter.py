@@ -0,0 +1,64 @@
+"""Detection pre-filter, run once per chunk before the tracking loop.
+
+Every detection handed to ByteTrack takes part in its association on
+every frame, including low-confidence ones and detections off the pitch
+(bench, spectators, staff). prefilter() drops both kinds for a whole
+chunk in one vectorized pass over its flat columns, so the per-frame loop
+only sees the detections that can belong to a player.
+"""
+
+import numpy as np
+
+
+def points_in_polygon(x, y, polygon):
+    """Test points against a polygon (even-odd rule).
+
+    :param x: (N,) x coordinates.
+    :param y: (N,) y coordinates.
+    :param polygon: (K, 2) polygon vertices, in order; the polygon is
+        closed implicitly.
+    :return: (N,) boolean array, True for points inside the polygon.
+    """
+    polygon = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+    inside = np.zeros(len(x), dtype=bool)
+    # One vectorized crossing test per edge; a pitch outline has few edges
+    for (x0, y0), (x1, y1) in zip(polygon, np.roll(polygon, -1, axis=0)):
+        if y0 == y1:
+            continue
+        spans = (y0 > y) != (y1 > y)
+        crossing_x = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+        inside ^= spans & (x < crossing_x)
+    return inside
+
+
+def prefilter_mask(chunk, config):
+    """Return the (N,) mask of the chunk's objects that pass config's filters.
+
+    :param chunk: A DetectionChunk.
+    :param config: TrackerConfig with min_confidence and pitch_polygon.
+    """
+    keep = np.asarray(chunk.confidence) >= config.min_confidence
+    if config.pitch_polygon is not None:
+        keep &= points_in_polygon(
+            np.asarray(chunk.global_x),
+            np.asarray(chunk.centers[:, 1]),
+            config.pitch_polygon,
+        )
+    return keep
+
+
+def prefilter(chunk, config, keep_pos=None):
+    """Drop the detections of a chunk that fail config's filters.
+
+    :param chunk: A DetectionChunk.
+    :param config: TrackerConfig with min_confidence and pitch_polygon.
+    :param keep_pos: Optional frame position whose objects are all kept,
+        e.g. the start frame, whose object indices a start_map refers to.
+    :return: The filtered chunk; chunk itself if nothing is dropped.
+    """
+    keep = prefilter_mask(chunk, config)
+    if keep_pos is not None:
+        keep[chunk.rows(keep_pos)] = True
+    if keep.all():
+        return chunk
+    return chunk.select(keep)
@@ -0,0 +1,134 @@
+"""Per-stage timing of the tracking loop.
+
+A StageProfiler collects one duration sample per stage and frame. The
+tracking loop only touches it behind a flag that is decided once per run,
+so a run without a profiler pays a boolean test per stage and nothing
+else. Results are available as a summary with latency histograms (for the
+API response) or as a Chrome trace file (chrome://tracing, Perfetto or
+speedscope) for flame-style inspection.
+"""
+
+import json
+import time
+from array import array
+
+import numpy as np
+
+# Stages of the tracking loop, in the order they run for a frame
+PREFILTER = "prefilter"  # Dropping detections, once per chunk
+DETECTIONS = "detections"  # Building sv.Detections from the chunk
+BYTETRACK = "bytetrack"  # tracker.update_with_detections
+ID_MAPPING = "id_mapping"  # Assigning / updating internal ids
+INTERPOLATION = "interpolation"  # Filling gaps of tracks not updated
+LOST_TRACKS = "lost_tracks"  # Lost-track management
+CHECKPOINT = "checkpoint"  # Saving tracker state snapshots
+FORMATTING = "formatting"  # Formatting the output
+STAGES = (
+    PREFILTER,
+    DETECTIONS,
+    BYTETRACK,
+    ID_MAPPING,
+    INTERPOLATION,
+    LOST_TRACKS,
+    CHECKPOINT,
+    FORMATTING,
+)
+
+# Histogram bucket edges, in microseconds (1 us to ~1 s, powers of two)
+HISTOGRAM_EDGES_US = 2.0 ** np.arange(21)
+
+clock = time.perf_counter
+
+
+class StageProfiler:
+    """Collects stage durations of one or more tracking runs."""
+
+    def __init__(self):
+        self._stage = array("b")
+        self._start = array("d")
+        self._duration = array("d")
+        self._codes = {name: code for code, name in enumerate(STAGES)}
+
+    def __len__(self):
+        return len(self._stage)
+
+    def lap(self, stage, start):
+        """Record stage as having run from start until now.
+
+        :param stage: Stage name, one of STAGES.
+        :param start: clock() value at which the stage began.
+        :return: The current clock() value, i.e. the start of the next stage.
+        """
+        now = clock()
+        self._stage.append(self._codes[stage])
+        self._start.append(start)
+        self._duration.append(now - start)
+        return now
+
+    def durations(self, stage):
+        """Return all durations of a stage, in seconds."""
+        stages = np.frombuffer(self._stage, dtype=np.int8)
+        durations = np.frombuffer(self._duration, dtype=np.float64)
+        return durations[stages == self._codes[stage]]
+
+    def summary(self):
+        """Summarize the recorded stages.
+
+        :return: {"total_ms", "stages": {stage: {"count", "total_ms",
+            "share", "mean_us", "p50_us", "p90_us", "p99_us", "max_us",
+            "histogram": {"edges_us", "counts"}}}}. Stages that never ran
+            are left out; histogram counts[i] is the number of samples
+            between edges_us[i] and edges_us[i + 1].
+        """
+        total = float(np.sum(np.frombuffer(self._duration, dtype=np.float64)))
+        stages = {}
+        for stage in STAGES:
+            durations_us = self.durations(stage) * 1e6
+            if not len(durations_us):
+                continue
+            p50, p90, p99 = np.percentile(durations_us, [50, 90, 99]).tolist()
+            counts, _ = np.histogram(
+                np.clip(durations_us, HISTOGRAM_EDGES_US[0], HISTOGRAM_EDGES_US[-1]),
+                HISTOGRAM_EDGES_US,
+            )
+            used = np.flatnonzero(counts)
+            lo, hi = used[0], used[-1] + 1
+            stage_total = float(durations_us.sum()) / 1e3
+            stages[stage] = {
+                "count": len(durations_us),
+                "total_ms": stage_total,
+                "share": stage_total / (total * 1e3) if total else 0.0,
+                "mean_us": float(durations_us.mean()),
+                "p50_us": p50,
+                "p90_us": p90,
+                "p99_us": p99,
+                "max_us": float(durations_us.max()),
+                "histogram": {
+                    "edges_us": HISTOGRAM_EDGES_US[lo : hi + 1].tolist(),
+                    "counts": counts[lo:hi].tolist(),
+                },
+            }
+        return {"total_ms": total * 1e3, "stages": stages}
+
+    def trace_events(self):
+        """Return the samples as Chrome trace "complete" events."""
+        if not len(self):
+            return []
+        origin = self._start[0]
+        return [
+            {
+                "name": STAGES[stage],
+                "cat": "tracking",
+                "ph": "X",
+                "ts": (start - origin) * 1e6,
+                "dur": duration * 1e6,
+                "pid": 0,
+                "tid": 0,
+            }
+            for stage, start, duration in zip(self._stage, self._start, self._duration)
+        ]
+
+    def write_trace(self, path):
+        """Write the samples as a Chrome trace JSON file."""
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.trace_events()}, f)
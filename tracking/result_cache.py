@@ -0,0 +1,102 @@
+"""Size-bounded LRU cache of tracking results.
+
+Operators often re-submit the same (frame_id, coords) correction, after a
+UI refresh or when two reviewers look at the same moment. ResultCache keeps
+recent results serialized, so a repeated request costs one unpickle instead
+of a full tracking run. Every entry belongs to a data version (detection
+file and homography files); when the version changes, the cache is
+emptied.
+"""
+
+import hashlib
+import json
+import pickle
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def coords_digest(coord_ids):
+    """Hash update() coordinates independently of their JSON spelling.
+
+    Ids and sources are normalized to integers and positions to floats, so
+    e.g. 1 and 1.0 hash equally. The order of the coordinates is kept, as
+    it can affect the start mapping.
+
+    :param coord_ids: [{"id", "c", "src"}, ...] as passed to update().
+    :return: Hex digest string.
+    """
+    normalized = [
+        [
+            int(mapping["id"]),
+            np.asarray(mapping["c"], dtype=np.float64).reshape(2).tolist(),
+            int(mapping["src"]),
+        ]
+        for mapping in coord_ids
+    ]
+    return hashlib.sha1(json.dumps(normalized).encode()).hexdigest()
+
+
+class ResultCache:
+    """LRU cache bounded by the total size of its serialized values.
+
+    :param max_bytes: Upper bound of the summed entry sizes. Values larger
+        than this are not cached.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.version = None  # Data version the entries belong to
+        self.size = 0  # Summed size of all entries, in bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # {key: pickled value}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def check_version(self, version):
+        """Drop every entry if the data version has changed."""
+        if version != self.version:
+            self.clear()
+            self.version = version
+
+    def get(self, key):
+        """Return a fresh copy of the value cached for key, or None."""
+        data = self._entries.get(key)
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return pickle.loads(data)
+
+    def put(self, key, value):
+        """Cache value under key, evicting least recently used entries."""
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self._entries[key] = data
+        self.size += len(data)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def clear(self):
+        """Drop all entries."""
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self):
+        """Return {"entries", "bytes", "hits", "misses"}."""
+        return {
+            "entries": len(self),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,294 @@
+"""Resident tracking server with an asyncio HTTP front end.
+
+The server keeps everything a tracking request needs warm: the detection
+store is ingested once and memory-mapped, and every worker process keeps
+its own homography cache and result cache between requests.
+Requests are accepted on asyncio and the CPU-bound tracking runs in a
+process pool, so concurrent operator requests do not block each other.
+
+A POST /update sent with ``Accept: application/x-ndjson`` is answered as a
+stream: one JSON line per frame as soon as it is tracked, then a final
+{"lost_frame_id", "lost_ids"} line (or an {"error"} line on failure).
+
+Usage: python -m tracking.service [host] [port] [workers]
+"""
+
+import asyncio
+import json
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+
+from tracking import detection_store
+from tracking.app import batch_update_data, stream_update_data, update_data
+from tracking.tracker import DETECTIONS_PATH
+from tracking.transform_utility import (
+    LEFT_HOMOGRAPHY_PATH,
+    RIGHT_HOMOGRAPHY_PATH,
+    get_homography,
+)
+
+DEFAULT_HOST = "localhost"
+DEFAULT_PORT = 5000
+MAX_BODY_SIZE = 16 * 1024 * 1024  # Largest accepted request body, in bytes
+NDJSON_TYPE = "application/x-ndjson"
+
+
+def warm_up(json_path=DETECTIONS_PATH):
+    """Load the detection store and both homographies into this process."""
+    detection_store.load(json_path)
+    get_homography(LEFT_HOMOGRAPHY_PATH).refresh()
+    get_homography(RIGHT_HOMOGRAPHY_PATH).refresh()
+
+
+def _stream_to_queue(payload, queue):
+    """Worker side of a streamed /update: put JSON lines, then None."""
+    try:
+        for item in stream_update_data(payload):
+            queue.put(json.dumps(item))
+    finally:
+        queue.put(None)
+
+
+class HTTPError(Exception):
+    """An error that is reported to the client with a status code."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class TrackingService:
+    """asyncio HTTP server answering tracking requests from a process pool.
+
+    :param host: Interface to listen on.
+    :param port: TCP port to listen on.
+    :param max_workers: Size of the tracking process pool, defaults to the
+        CPU count.
+    :param json_path: Detection JSON file served by this instance.
+    """
+
+    def __init__(
+        self,
+        host=DEFAULT_HOST,
+        port=DEFAULT_PORT,
+        max_workers=None,
+        json_path=DETECTIONS_PATH,
+    ):
+        self.host = host
+        self.port = port
+        self.max_workers = max_workers
+        self.json_path = json_path
+        self.executor = None
+        self.manager = None  # Provides the queues streamed results come through
+        self.server = None
+        # {(method, path): coroutine function taking the decoded JSON body and
+        # the request headers, returning (status, result). result is either
+        # JSON-serializable or an async iterator of NDJSON lines.}
+        self.routes = {
+            ("POST", "/update"): self.handle_update,
+            ("POST", "/update/batch"): self.handle_batch_update,
+        }
+
+    async def start(self):
+        """Warm the data up, start the worker pool and begin listening."""
+        # Ingest once here so the workers only memory-map the store
+        warm_up(self.json_path)
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=warm_up,
+            initargs=(self.json_path,),
+        )
+        self.manager = multiprocessing.Manager()
+        self.server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port
+        )
+
+    async def serve_forever(self):
+        """Start the service and serve until cancelled."""
+        await self.start()
+        print(f"Tracking service listening on http://{self.host}:{self.port}")
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop listening and shut the worker pool down."""
+        if self.server is not None:
+            self.server.close()
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+        if self.manager is not None:
+            self.manager.shutdown()
+            self.manager = None
+
+    async def run_in_pool(self, func, *args):
+        """Run func(*args) in the tracking process pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def stream_in_pool(self, func, *args):
+        """Run func(*args, queue) in the process pool and yield what it puts.
+
+        func must put None into the queue when it is done.
+        """
+        loop = asyncio.get_running_loop()
+        queue = self.manager.Queue()
+        future = loop.run_in_executor(self.executor, func, *args, queue)
+        while True:
+            get = loop.run_in_executor(None, queue.get)
+            await asyncio.wait({get, future}, return_when=asyncio.FIRST_COMPLETED)
+            if not get.done() and future.exception() is not None:
+                queue.put(None)  # Release the blocked reader thread
+                raise future.exception()
+            item = await get
+            if item is None:
+                break
+            yield item
+        await future
+
+    async def handle_update(self, payload, headers):
+        """POST /update: track from a corrected frame, see app.update_data."""
+        if NDJSON_TYPE in headers.get("accept", ""):
+            return HTTPStatus.OK, self._stream_update(payload)
+        result = await self.run_in_pool(update_data, payload)
+        status = HTTPStatus.BAD_REQUEST if "error" in result else HTTPStatus.OK
+        return status, result
+
+    async def handle_batch_update(self, payload, headers):
+        """POST /update/batch: run several updates concurrently in the pool.
+
+        See app.batch_update_data for the payload and result format. It maps
+        the jobs over the pool from a thread, so the event loop keeps
+        serving other requests while the batch runs.
+        """
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            None, batch_update_data, payload, self.executor.map
+        )
+        status = HTTPStatus.BAD_REQUEST if "error" in result else HTTPStatus.OK
+        return status, result
+
+    async def _stream_update(self, payload):
+        try:
+            async for line in self.stream_in_pool(_stream_to_queue, payload):
+                yield line
+        except Exception as e:  # pylint: disable=broad-except
+            # The status line is already sent, so report the failure inline
+            yield json.dumps({"error": str(e)})
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                keep_alive = await self._handle_request(reader, writer)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, reader, writer):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError as e:
+            if e.partial:
+                raise
+            return False  # Client closed an idle connection
+
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        headers = {}
+        for line in header_lines:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        try:
+            method, path, version = request_line.split(" ", 2)
+        except ValueError:
+            await self._send_json(
+                writer, HTTPStatus.BAD_REQUEST, {"error": "Bad request"}
+            )
+            return False
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection == "keep-alive" or (
+            version == "HTTP/1.1" and connection != "close"
+        )
+
+        try:
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY_SIZE:
+                raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Body too large")
+            body = await reader.readexactly(length) if length else b""
+            status, result = await self._dispatch(
+                method, path.split("?", 1)[0], headers, body
+            )
+        except HTTPError as e:
+            status, result = e.status, {"error": str(e)}
+        except ValueError:
+            status, result = HTTPStatus.BAD_REQUEST, {"error": "Bad request"}
+        except Exception as e:  # pylint: disable=broad-except
+            status, result = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+
+        if hasattr(result, "__aiter__"):
+            await self._send_ndjson(writer, status, result, keep_alive)
+        else:
+            await self._send_json(writer, status, result, keep_alive)
+        return keep_alive
+
+    async def _dispatch(self, method, path, headers, body):
+        handler = self.routes.get((method, path))
+        if handler is None:
+            if any(route_path == path for _, route_path in self.routes):
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Method not allowed")
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Not found")
+        try:
+            payload = json.loads(body) if body else None
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid JSON: {e}") from e
+        return await handler(payload, headers)
+
+    async def _send_json(self, writer, status, result, keep_alive=False):
+        body = json.dumps(result).encode()
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def _send_ndjson(self, writer, status, lines, keep_alive=False):
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {NDJSON_TYPE}\r\n"
+            "Transfer-Encoding: chunked\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        )
+        writer.write(head.encode("latin-1"))
+        await writer.drain()
+        # One chunk per line, flushed as soon as it is available
+        async for line in lines:
+            data = line.encode() + b"\n"
+            writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+if __name__ == "__main__":
+    host = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_HOST
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PORT
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    try:
+        asyncio.run(TrackingService(host, port, workers).serve_forever())
+    except KeyboardInterrupt:
+        pass
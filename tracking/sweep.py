@@ -0,0 +1,236 @@
+"""Parallel tracker parameter sweeps against labeled tracks.
+
+Every configuration of a parameter grid tracks the same detection file in
+its own worker process and is scored against the true tracks of a label
+file (as written by tracking.synthetic):
+
+- id_switches: how often a labeled player changes its matched track id,
+- lost_per_minute: "lost" events per minute of play,
+- recall: share of visible labeled positions matched by an output track,
+- runtime: tracking time in seconds.
+
+Usage: python -m tracking.sweep <detections.json> <labels.json> [grid.json] [workers] [report.json]
+
+grid.json maps TrackerConfig parameter names to lists of values, e.g.
+{"max_match_distance": [20, 28, 40], "lost_report_frames": [60, 120]}.
+"""
+
+import itertools
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from tracking import detection_store, event_log
+from tracking.config import DEFAULT_CONFIG
+from tracking.event_log import EventLog
+from tracking.tracker import track_chunk
+
+# Grid swept when none is given
+DEFAULT_GRID = {
+    "max_match_distance": [20, 28, 40],
+    "lost_track_buffer": [10, 30],
+    "lost_report_frames": [60, 120],
+}
+# Largest distance between an output track and a labeled player that still
+# counts as a match, in top-down pixels
+LABEL_MATCH_DISTANCE = 10
+
+
+def parameter_grid(grid, base=DEFAULT_CONFIG):
+    """Expand a parameter grid into configurations.
+
+    :param grid: Mapping of TrackerConfig parameter names to value lists.
+    :param base: Config providing the parameters not in the grid.
+    :return: List of TrackerConfig, one per combination of values.
+    """
+    names = list(grid)
+    return [
+        base.replace(**dict(zip(names, values)))
+        for values in itertools.product(*(grid[name] for name in names))
+    ]
+
+
+def load_labels(labels_path):
+    """Load the visible labeled positions of a label file.
+
+    :param labels_path: Label JSON file, see tracking.synthetic.
+    :return: A tuple (frames, ids, centers) of arrays with one row per
+        visible labeled player and frame, sorted by frame.
+    """
+    with open(labels_path) as f:
+        labels = json.load(f)
+    rows = [
+        (frame["frame_index"], track["id"], *track["center"])
+        for frame in labels
+        for track in frame["tracks"]
+        if track["visible"]
+    ]
+    rows = np.array(rows, dtype=np.float64).reshape(-1, 4)
+    rows = rows[np.argsort(rows[:, 0], kind="stable")]
+    return rows[:, 0].astype(np.int64), rows[:, 1].astype(np.int64), rows[:, 2:]
+
+
+def count_id_switches(
+    frame_indices, records, labels, max_distance=LABEL_MATCH_DISTANCE
+):
+    """Compare tracking output with labeled tracks.
+
+    In every frame the output tracks are matched one-to-one to the labeled
+    players (minimum total distance, gated by max_distance). An id switch
+    is counted whenever a player is matched to a different track id than
+    at its previous match.
+
+    :param frame_indices: Frame index of every output frame, see
+        track_chunk.
+    :param records: (M, 5) output records, see track_chunk.
+    :param labels: (frames, ids, centers) as returned by load_labels.
+    :param max_distance: Matching gate, in top-down pixels.
+    :return: A tuple (id_switches, matched, total) where matched is the
+        number of labeled positions with a matching track, out of total.
+    """
+    label_frames, label_ids, label_centers = labels
+    record_frames = np.asarray(frame_indices, dtype=np.int64)[
+        records[:, 0].astype(np.int64)
+    ]
+    order = np.argsort(record_frames, kind="stable")
+    record_frames = record_frames[order]
+    record_ids = records[order, 1].astype(np.int64)
+    record_centers = records[order, 3:]
+
+    last_track = {}  # Labeled id -> track id at its previous match
+    switches = 0
+    matched = 0
+    frames, starts = np.unique(label_frames, return_index=True)
+    stops = np.append(starts[1:], len(label_frames))
+    lo = np.searchsorted(record_frames, frames, side="left")
+    hi = np.searchsorted(record_frames, frames, side="right")
+    for start, stop, first, last in zip(starts, stops, lo, hi):
+        if first == last:
+            continue
+        distances = np.linalg.norm(
+            label_centers[start:stop, None] - record_centers[None, first:last],
+            axis=2,
+        )
+        rows, cols = linear_sum_assignment(distances)
+        close = distances[rows, cols] <= max_distance
+        for label_id, track_id in zip(
+            label_ids[start:stop][rows[close]].tolist(),
+            record_ids[first:last][cols[close]].tolist(),
+        ):
+            previous = last_track.get(label_id)
+            if previous is not None and previous != track_id:
+                switches += 1
+            last_track[label_id] = track_id
+        matched += int(close.sum())
+    return switches, matched, len(label_frames)
+
+
+def evaluate(json_path, labels_path, config=DEFAULT_CONFIG):
+    """Track a whole detection file with one configuration and score it.
+
+    :param json_path: Detection JSON file.
+    :param labels_path: Label JSON file with the true tracks.
+    :param config: TrackerConfig to evaluate.
+    :return: {"config", "frames", "runtime", "id_switches",
+        "lost_events", "lost_per_minute", "recall"}.
+    """
+    store = detection_store.load(json_path)
+    events = EventLog("info")
+    start = time.perf_counter()
+    _, _, frame_indices, records = track_chunk(
+        store,
+        int(store.frame_index[0]),
+        {},
+        stop_on_loss=False,
+        events=events,
+        config=config,
+    )
+    runtime = time.perf_counter() - start
+
+    switches, matched, total = count_id_switches(
+        frame_indices, records, load_labels(labels_path)
+    )
+    lost_events = len(events.query(event_log.LOST))
+    minutes = len(frame_indices) / config.frame_rate / 60
+    return {
+        "config": config.to_dict(),
+        "frames": len(frame_indices),
+        "runtime": runtime,
+        "id_switches": switches,
+        "lost_events": lost_events,
+        "lost_per_minute": lost_events / minutes if minutes else 0.0,
+        "recall": matched / total if total else 0.0,
+    }
+
+
+def sweep(json_path, labels_path, configs, max_workers=None):
+    """Evaluate configurations in parallel, one worker process each.
+
+    :param json_path: Detection JSON file (ingested into a store first).
+    :param labels_path: Label JSON file with the true tracks.
+    :param configs: Iterable of TrackerConfig.
+    :param max_workers: Process pool size, defaults to the CPU count.
+    :return: List of evaluate() results, in the order of configs.
+    """
+    configs = list(configs)
+    # Ingest once up front so the workers only memory-map the store
+    detection_store.load(json_path)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(
+            executor.map(
+                evaluate,
+                [json_path] * len(configs),
+                [labels_path] * len(configs),
+                configs,
+            )
+        )
+
+
+def format_report(results, base=DEFAULT_CONFIG):
+    """Render sweep results as a text table, fewest id switches first.
+
+    Only the parameters that differ from base are listed per row.
+    """
+    defaults = base.to_dict()
+    lines = [
+        f"{'switches':>8} {'lost/min':>9} {'recall':>7} {'seconds':>8}  parameters"
+    ]
+    for result in sorted(
+        results, key=lambda result: (result["id_switches"], result["lost_per_minute"])
+    ):
+        changed = ", ".join(
+            f"{name}={value}"
+            for name, value in result["config"].items()
+            if value != defaults.get(name)
+        )
+        lines.append(
+            f"{result['id_switches']:>8} {result['lost_per_minute']:>9.2f} "
+            f"{result['recall']:>7.3f} {result['runtime']:>8.2f}  "
+            f"{changed or 'defaults'}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    if not 3 <= len(sys.argv) <= 6:
+        print(
+            "Usage: python -m tracking.sweep <detections.json> <labels.json> "
+            "[grid.json] [workers] [report.json]"
+        )
+        sys.exit(1)
+
+    grid = DEFAULT_GRID
+    if len(sys.argv) >= 4:
+        with open(sys.argv[3]) as f:
+            grid = json.load(f)
+    workers = int(sys.argv[4]) if len(sys.argv) >= 5 else None
+
+    results = sweep(sys.argv[1], sys.argv[2], parameter_grid(grid), workers)
+    print(format_report(results))
+    if len(sys.argv) == 6:
+        with open(sys.argv[5], "w") as f:
+            json.dump(results, f, indent=2)
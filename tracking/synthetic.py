@@ -0,0 +1,171 @@
+"""Deterministic synthetic match data for benchmarks and parameter tuning.
+
+Players move on the 752x300 top-down pitch with smooth random velocities.
+Each frame they are turned into radon.json-style detections: positions
+with x >= RIGHT_OFFSET belong to the right camera (and are stored with
+the offset removed, as the real data is), everything else to the left
+one. Noise, occlusion dropouts, identity swaps and clutter detections are
+all controllable, and the true identities are written to a separate
+label file.
+
+Usage: python -m tracking.synthetic <detections.json> <labels.json> [frames] [players] [seed]
+"""
+
+import json
+import sys
+
+import numpy as np
+
+from tracking.transform_utility import RIGHT_OFFSET
+
+PITCH_WIDTH = 752
+PITCH_HEIGHT = 300
+
+
+def generate_match(
+    n_frames=1800,
+    n_players=22,
+    start_frame=0,
+    noise=0.3,
+    dropout=0.03,
+    max_occlusion=1,
+    swap_rate=0.0,
+    clutter=0.0,
+    max_speed=0.5,
+    seed=0,
+):
+    """Generate a synthetic match.
+
+    :param n_frames: Number of frames.
+    :param n_players: Number of players; they alternate between team 0 and 1.
+    :param start_frame: frame_index of the first frame.
+    :param noise: Standard deviation of the detection position noise, in
+        top-down pixels.
+    :param dropout: Per-frame probability that a visible player becomes
+        occluded (produces no detection).
+    :param max_occlusion: Longest occlusion, in frames; every occlusion
+        lasts between 1 and max_occlusion frames.
+    :param swap_rate: Per-frame probability that two players of the same
+        team swap places (an identity swap for the tracker).
+    :param clutter: Mean number of false detections per frame.
+    :param max_speed: Highest speed per axis, in pixels per frame (0.5 is
+        roughly a 4 m/s run at 59 fps).
+    :param seed: Random seed; equal arguments produce equal matches.
+    :return: A tuple (frames, labels). frames is a list of radon.json
+        frame dicts. labels holds, per frame, {"frame_index", "tracks":
+        [{"id", "team_index", "center", "visible"}]} with the true
+        top-down positions (x including the right camera offset).
+    """
+    rng = np.random.default_rng(seed)
+    bounds = np.array([PITCH_WIDTH, PITCH_HEIGHT], dtype=np.float64)
+    teams = np.arange(n_players) % 2
+    positions = rng.uniform(0.05, 0.95, size=(n_players, 2)) * bounds
+    velocities = rng.uniform(-1, 1, size=(n_players, 2))
+    occluded = np.zeros(n_players, dtype=np.int64)  # Remaining occluded frames
+
+    frames = []
+    labels = []
+    for frame_index in range(start_frame, start_frame + n_frames):
+        velocities += rng.normal(0, 0.05, size=velocities.shape)
+        np.clip(velocities, -max_speed, max_speed, out=velocities)
+        positions += velocities
+        # Bounce off the pitch edges
+        outside = (positions < 5) | (positions > bounds - 5)
+        velocities[outside] *= -1
+        np.clip(positions, 5, bounds - 5, out=positions)
+
+        if swap_rate and rng.random() < swap_rate:
+            team = rng.integers(2)
+            members = np.flatnonzero(teams == team)
+            if len(members) >= 2:
+                a, b = rng.choice(members, size=2, replace=False)
+                positions[[a, b]] = positions[[b, a]]
+                velocities[[a, b]] = velocities[[b, a]]
+
+        occluded = np.maximum(occluded - 1, 0)
+        starts = (occluded == 0) & (rng.random(n_players) < dropout)
+        occluded[starts] = rng.integers(1, max_occlusion + 1, size=starts.sum())
+        visible = occluded == 0
+
+        centers = positions[visible] + rng.normal(0, noise, size=(visible.sum(), 2))
+        detection_teams = teams[visible]
+        confidence = rng.uniform(0.3, 0.99, size=len(centers))
+
+        n_clutter = rng.poisson(clutter) if clutter else 0
+        if n_clutter:
+            centers = np.vstack([centers, rng.uniform(0, 1, (n_clutter, 2)) * bounds])
+            detection_teams = np.concatenate(
+                [detection_teams, rng.integers(2, size=n_clutter)]
+            )
+            confidence = np.concatenate(
+                [confidence, rng.uniform(0.05, 0.4, size=n_clutter)]
+            )
+
+        objects = []
+        for (x, y), team, conf in zip(
+            centers.tolist(), detection_teams.tolist(), confidence.tolist()
+        ):
+            source = "left"
+            if x >= RIGHT_OFFSET:
+                source = "right"
+                x -= RIGHT_OFFSET
+            objects.append(
+                {
+                    "transformed_center": [round(x, 3), round(y, 3)],
+                    "source": source,
+                    "confidence": round(conf, 3),
+                    "team_index": team,
+                }
+            )
+        # Detectors do not report objects in a stable order
+        objects = [objects[i] for i in rng.permutation(len(objects))]
+        frames.append({"frame_index": frame_index, "objects": objects})
+
+        labels.append(
+            {
+                "frame_index": frame_index,
+                "tracks": [
+                    {
+                        "id": player + 1,
+                        "team_index": team,
+                        "center": [round(x, 3), round(y, 3)],
+                        "visible": seen,
+                    }
+                    for player, (team, (x, y), seen) in enumerate(
+                        zip(teams.tolist(), positions.tolist(), visible.tolist())
+                    )
+                ],
+            }
+        )
+    return frames, labels
+
+
+def write_match(json_path, labels_path=None, **kwargs):
+    """Generate a synthetic match and write it to disk.
+
+    :param json_path: Output path of the detections (radon.json format).
+    :param labels_path: Optional output path of the true tracks.
+    :param kwargs: Arguments for generate_match().
+    :return: The detection frames.
+    """
+    frames, labels = generate_match(**kwargs)
+    with open(json_path, "w") as f:
+        json.dump(frames, f)
+    if labels_path is not None:
+        with open(labels_path, "w") as f:
+            json.dump(labels, f)
+    return frames
+
+
+if __name__ == "__main__":
+    if not 3 <= len(sys.argv) <= 6:
+        print(
+            "Usage: python -m tracking.synthetic <detections.json> <labels.json> "
+            "[frames] [players] [seed]"
+        )
+        sys.exit(1)
+
+    options = {}
+    for name, value in zip(("n_frames", "n_players", "seed"), sys.argv[3:]):
+        options[name] = int(value)
+    write_match(sys.argv[1], sys.argv[2], **options)
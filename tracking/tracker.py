@@ -1,340 +1,689 @@
 import json
+import os
 
 import matplotlib.pyplot as plt  # For plotting
 import numpy as np
 import supervision as sv  # Includes ByteTrack implementation
 
-from tracking.transform_utility import reverse_transform_point, transform_point
+from tracking import detection_store, event_log, profiling
+from tracking.config import DEFAULT_CONFIG
+from tracking.detection_store import DetectionChunk
+from tracking.id_assignment import (
+    START_MATCH_TOLERANCE,
+    assign_new_tracks,
+    match_coordinates,
+)
+from tracking.interpolation import GapFiller, fill_gaps
+from tracking.prefilter import prefilter
+from tracking.result_cache import ResultCache, coords_digest
+from tracking.tracker_state import TrackerState, checkpoint_key
+from tracking.transform_utility import (
+    LEFT_HOMOGRAPHY_PATH,
+    RIGHT_HOMOGRAPHY_PATH,
+    get_homography,
+    reverse_transform_points,
+    transform_points,
+)
 
 CHUNK_LENGTH = 1800
+DETECTIONS_PATH = "radon.json"
 
+# Recent update() results, see result_cache
+results = ResultCache()
 
-def update(start_frame, coord_ids):
-    """Update the start mapping based on coord_ids, filter the JSON data, and
-    then perform tracking with the filtered data.
+
+def update(
+    start_frame,
+    coord_ids,
+    events=None,
+    profiler=None,
+    config=None,
+    stop_on_loss=True,
+    losses=None,
+):
+    """Update the start mapping based on coord_ids, select the frame range
+    from the detection store, and then perform tracking on that range.
 
     :param start_frame: The frame index from which to start processing.
     :param coord_ids: A dictionary mapping 2D coordinate arrays (or
         string representations of them) to an integer id.
+    :param events: Optional EventLog receiving the tracking events.
+    :param profiler: Optional StageProfiler timing the tracking stages.
+    :param config: Optional TrackerConfig, defaults to DEFAULT_CONFIG.
+    :param stop_on_loss: Stop at the first track lost for good (the
+        default). If False, the whole chunk is tracked.
+    :param losses: Optional LossReport; lost ids are then held and their
+        losses and re-link candidates recorded, see tracking.loss_report.
     :return: A tuple (frame_index, lost_ids, tracking_result) where
         tracking_result is a JSON-like dict.
+
+    Results of plain calls (without events, profiler or losses, which need
+    an actual run) are cached in ``results``, keyed by start frame, the
+    coordinates, the tracker parameters and the data version.
     """
-    # Load original JSON from disk
-    with open("radon.json") as f:
-        input_data = json.load(f)
+    coord_ids = list(coord_ids)
+    config = config or DEFAULT_CONFIG
+    cache_key = None
+    if events is None and profiler is None and losses is None:
+        results.check_version(_data_version())
+        cache_key = (
+            start_frame,
+            coords_digest(coord_ids),
+            _params_key(config),
+            stop_on_loss,
+        )
+        cached = results.get(cache_key)
+        if cached is not None:
+            return cached
+
+    chunk, start_map = _prepare_update(start_frame, coord_ids)
+
+    # Feed the selected frames along with the start_map to the tracker
+    result = perform_tracking_from_json(
+        chunk,
+        start_frame,
+        start_map,
+        events=events,
+        profiler=profiler,
+        config=config,
+        stop_on_loss=stop_on_loss,
+        losses=losses,
+    )
+    if cache_key is not None:
+        results.put(cache_key, result)
+    return result
+
+
+def _data_version():
+    """Identify the current detection data and homography files."""
+    store = detection_store.load(DETECTIONS_PATH)
+    return (
+        os.path.abspath(DETECTIONS_PATH),
+        json.dumps(store.manifest, sort_keys=True),
+        get_homography(LEFT_HOMOGRAPHY_PATH).version,
+        get_homography(RIGHT_HOMOGRAPHY_PATH).version,
+    )
 
-    # Find the start frame data
-    start_frame_data = next(
-        (frame for frame in input_data if frame.get("frame_index") == start_frame), None
+
+def _params_key(config):
+    """Identify the parameters that affect a tracking result."""
+    return repr((config.key(), CHUNK_LENGTH))
+
+
+def update_stream(
+    start_frame,
+    coord_ids,
+    events=None,
+    profiler=None,
+    config=None,
+    stop_on_loss=True,
+    losses=None,
+):
+    """Streaming variant of update().
+
+    Takes the same arguments as update(). Yields every formatted frame as
+    soon as it has been tracked; the generator's return value (e.g. of
+    ``yield from``) is the tuple (frame_index, lost_ids).
+    """
+    chunk, start_map = _prepare_update(start_frame, coord_ids)
+    return (
+        yield from stream_tracking_from_json(
+            chunk,
+            start_frame,
+            start_map,
+            events=events,
+            profiler=profiler,
+            config=config,
+            stop_on_loss=stop_on_loss,
+            losses=losses,
+        )
     )
-    if start_frame_data is None:
+
+
+def _prepare_update(start_frame, coord_ids):
+    """Select the chunk for an update and build its start mapping.
+
+    :return: A tuple (chunk, start_map).
+    """
+    # Memory-mapped columnar view of radon.json (ingested on first use)
+    store = detection_store.load(DETECTIONS_PATH)
+
+    # Read only the frames in the desired range
+    chunk = store.frame_range(start_frame, start_frame + CHUNK_LENGTH)
+    return _map_start_objects(chunk, start_frame, coord_ids)
+
+
+def _map_start_objects(chunk, start_frame, coord_ids):
+    """Match coord_ids to the objects of a chunk's start frame.
+
+    Coordinates without a matching object are added to the start frame as
+    new objects.
+
+    :return: A tuple (chunk, start_map).
+    """
+    # Find the start frame data
+    start_pos = chunk.position(start_frame)
+    if start_pos is None:
         raise ValueError(f"Start frame {start_frame} not found in radon.json")
 
     # Create start_map: mapping from object index in the start frame to the assigned id
     start_map = {}  # {object_index: assigned_id}
-    objects = start_frame_data.get("objects", [])
+    start_centers = chunk.centers[chunk.rows(start_pos)]
+    new_centers = []
+    new_ids = []
+
+    # Forward-transform all requested coordinates in one batch
+    coord_ids = list(coord_ids)
+    coords = transform_points(
+        [mapping["c"] for mapping in coord_ids],
+        [mapping["src"] for mapping in coord_ids],
+    )
+    # Match all coordinates against the start frame objects in one query
+    matches = match_coordinates(start_centers, coords).tolist()
 
-    for mapping in coord_ids:
+    for mapping, coord, match in zip(coord_ids, coords.tolist(), matches):
         # mapping is expected to be a dict with keys "id", "c", and "src"
-        coord = transform_point(
-            mapping["c"], mapping["src"]
-        )  # This is a list like [x, y]
         assigned_id = mapping["id"]  # The assigned id
-        # Convert the coordinate into a tuple for comparison
-        coord_tuple = tuple(coord)
-        match_found = False
-
-        for idx, obj in enumerate(objects):
-            transformed_center = obj.get("transformed_center")
-            if transformed_center is not None:
-                # Ensure transformed_center is a tuple for comparison
-                if isinstance(transformed_center, list):
-                    transformed_center = tuple(transformed_center)
-                # Use np.allclose with a small tolerance to compare coordinates
-                if np.allclose(transformed_center, coord_tuple, atol=1e-2):
-                    start_map[idx] = assigned_id
-                    match_found = True
-                    break
-
-        if not match_found:
+        if match >= 0:
+            start_map[match] = assigned_id
+            continue
+
+        # Objects added for earlier coordinates can be matched too
+        for offset, new_center in enumerate(new_centers):
+            if np.allclose(new_center, coord, atol=START_MATCH_TOLERANCE):
+                start_map[len(start_centers) + offset] = assigned_id
+                break
+        else:
             # No matching object found: add a new object with default values
-            new_object = {
-                "transformed_center": list(coord_tuple),
-                "source": "unknown",
-                "confidence": 1.0,
-                "team_index": assigned_id,
-            }
-            new_index = len(objects)
-            objects.append(new_object)
-            start_map[new_index] = assigned_id
-
-    # Filter the JSON data to include only frames in the desired range
-    filtered_data = [
-        frame
-        for frame in input_data
-        if start_frame <= frame.get("frame_index", 0) < start_frame + CHUNK_LENGTH
-    ]
-
-    # Feed the filtered JSON data (in-memory) along with the start_map to the tracker
-    return perform_tracking_from_json(filtered_data, start_frame, start_map)
-
-
-def perform_tracking_from_json(input_data, start_frame, start_map):
+            start_map[len(start_centers) + len(new_centers)] = assigned_id
+            new_centers.append(coord)
+            new_ids.append(assigned_id)
+
+    if new_ids:
+        chunk = chunk.with_objects(
+            start_pos,
+            new_centers,
+            confidence=[1.0] * len(new_ids),
+            team_index=new_ids,
+            source=[detection_store.UNKNOWN_SOURCE] * len(new_ids),
+        )
+    return chunk, start_map
+
+
+def perform_tracking_from_json(
+    input_data,
+    start_frame,
+    start_map,
+    state=None,
+    checkpoints=None,
+    events=None,
+    profiler=None,
+    config=None,
+    stop_on_loss=True,
+    losses=None,
+):
     """Perform tracking using ByteTrack based on bounding box information from
     input_data.
 
-    :param input_data: List of frame detection dictionaries.
+    :param input_data: A DetectionChunk, or a list of frame detection
+        dictionaries.
     :param start_frame: The starting frame index.
     :param start_map: Mapping from start frame's object indices to an
         assigned id.
+    :param state: Optional TrackerState to resume from (e.g. restored from
+        a checkpoint). input_data must then start after state.frame_index.
+    :param checkpoints: Optional CheckpointStore. The tracker state is saved
+        at every frame where a track is lost and at the end of the chunk.
+    :param events: Optional EventLog. "put", "lost" and "lost_long" events
+        at or above its level are recorded in it.
+    :param profiler: Optional StageProfiler. Every stage of the per-frame
+        loop and the final formatting are timed into it.
+    :param config: Optional TrackerConfig with the ByteTrack parameters,
+        the id range and the matching and lost thresholds. Defaults to
+        DEFAULT_CONFIG.
+    :param stop_on_loss: Return as soon as a track has been lost for more
+        than config.lost_report_frames (the default). If False, the whole
+        chunk is tracked.
+    :param losses: Optional LossReport. Tracks lost for more than
+        config.lost_report_frames are then held (their ids are not handed
+        out again, new tracks get spare ids above config.max_allowed_id
+        instead); every such loss, every later new track near a held id (a
+        re-link candidate) and every new track left without an id is
+        recorded in it.
     :return: A tuple (last_frame_index, lost_ids, tracking_result) where
         tracking_result is a JSON-like dict.
     """
-    # Initialize ByteTrack
-    tracker = sv.ByteTrack(
-        track_activation_threshold=0.1,
-        minimum_matching_threshold=0.98,
-        lost_track_buffer=10,
-        frame_rate=59,
-        minimum_consecutive_frames=1,
+    frame_index, lost_ids, frame_indices, records = track_chunk(
+        input_data,
+        start_frame,
+        start_map,
+        state=state,
+        checkpoints=checkpoints,
+        events=events,
+        profiler=profiler,
+        config=config,
+        stop_on_loss=stop_on_loss,
+        losses=losses,
     )
+    if profiler is None:
+        return frame_index, lost_ids, _format_track_records(frame_indices, records)
+
+    start = profiling.clock()
+    tracking_result = _format_track_records(frame_indices, records)
+    profiler.lap(profiling.FORMATTING, start)
+    return frame_index, lost_ids, tracking_result
+
+
+def stream_tracking_from_json(
+    input_data,
+    start_frame,
+    start_map,
+    state=None,
+    checkpoints=None,
+    events=None,
+    profiler=None,
+    config=None,
+    stop_on_loss=True,
+    losses=None,
+):
+    """Generator form of perform_tracking_from_json.
+
+    Takes the same arguments. Every frame is formatted and yielded as soon
+    as it has been tracked, so the output is never buffered as a whole.
+
+    Gap filling (see tracking.interpolation) holds every frame back until
+    config.max_gap_frames further frames have been tracked.
+
+    :return: (as the generator's return value) a tuple
+        (last_frame_index, lost_ids).
+    """
+    config = config or DEFAULT_CONFIG
+    filler = GapFiller(config.max_gap_frames, _state_anchors(state))
+    frames = _iter_tracked_frames(
+        input_data,
+        start_frame,
+        start_map,
+        state,
+        checkpoints,
+        stop_on_loss,
+        events,
+        profiler,
+        config,
+        losses,
+    )
+    while True:
+        try:
+            frame_index, frame_records = next(frames)
+        except StopIteration as stop:
+            result = stop.value
+            break
+        yield from _format_frames(filler.add(frame_index, frame_records), profiler)
+    yield from _format_frames(filler.flush(), profiler)
+    return result
+
+
+def _format_frames(filled_frames, profiler=None):
+    """Format the frames released by a GapFiller."""
+    for frame_index, frame_records in filled_frames:
+        if profiler is None:
+            yield _format_frame(frame_index, frame_records)
+            continue
+        start = profiling.clock()
+        frame = _format_frame(frame_index, frame_records)
+        profiler.lap(profiling.FORMATTING, start)
+        yield frame
+
+
+def track_chunk(
+    input_data,
+    start_frame,
+    start_map,
+    state=None,
+    checkpoints=None,
+    stop_on_loss=True,
+    events=None,
+    profiler=None,
+    config=None,
+    losses=None,
+    fill=True,
+):
+    """Run the tracking loop and return the raw per-object records.
+
+    Takes the same arguments as perform_tracking_from_json, plus:
+
+    :param fill: Fill the gaps of the tracks (the default). If False, only
+        the observed rows are returned, e.g. to be filled after combining
+        them with other records.
+    :return: A tuple (last_frame_index, lost_ids, frame_indices, records)
+        where frame_indices lists the frame index of every output frame and
+        records is an (M, 5) array of (frame position, track id, class id,
+        x, y) rows. Every track is output from its first observation on,
+        with gaps filled by fill_gaps().
+    """
+    config = config or DEFAULT_CONFIG
+    anchors = _state_anchors(state)
+    frame_indices = []  # Frame index of every output frame
+    track_records = []  # (frame position, track id, class id, x, y) per object
+    frames = _iter_tracked_frames(
+        input_data,
+        start_frame,
+        start_map,
+        state,
+        checkpoints,
+        stop_on_loss,
+        events,
+        profiler,
+        config,
+        losses,
+    )
+    while True:
+        try:
+            frame_index, frame_records = next(frames)
+        except StopIteration as stop:
+            last_frame_index, lost_ids = stop.value
+            break
+        frame_pos = len(frame_indices)
+        frame_indices.append(frame_index)
+        track_records.extend((frame_pos, *record) for record in frame_records)
+
+    if not fill:
+        return last_frame_index, lost_ids, frame_indices, _records_array(track_records)
+    if profiler is not None:
+        start = profiling.clock()
+    records = fill_gaps(
+        np.concatenate([anchors, _records_array(track_records)]),
+        len(frame_indices),
+        config.max_gap_frames,
+    )
+    if profiler is not None:
+        profiler.lap(profiling.INTERPOLATION, start)
+    return last_frame_index, lost_ids, frame_indices, records
 
-    # Tracking management variables
-    max_allowed_id = 23  # Maximum allowed internal id
-    active_tracks = {}
-    reusable_ids = list(range(1, max_allowed_id + 1))  # Pool of available IDs
-    track_id_map = {}  # Map external track ids to internal ids
-    frame_count = 0
-    active_track_counts = []
-    lost_tracker = [0] * 23
-    lost_array = set()
-    tracking_data = []
 
-    for frame_data in input_data:
-        frame_count += 1
-        frame_index = frame_data["frame_index"]
-        detections = frame_data["objects"]
-
-        bboxes = []
-        confidences = []
-        class_ids = []
-        for obj in detections:
-            # Adjust x coordinate for detections coming from "right" if needed
-            if obj["source"] == "right":
-                obj["transformed_center"][0] += 347
-            bbox = [
-                obj["transformed_center"][0] - 2.5,
-                obj["transformed_center"][1] - 2.5,
-                obj["transformed_center"][0] + 2.5,
-                obj["transformed_center"][1] + 2.5,
-            ]
-            bboxes.append(bbox)
-            class_ids.append(obj.get("team_index", -1))
-            confidences.append(obj["confidence"])
+def _state_anchors(state):
+    """Last output positions of a resumed state's tracks, as fill_gaps() rows.
 
-        if bboxes:
-            bboxes = np.array(bboxes, dtype=np.float32)
-        else:
-            bboxes = np.empty((0, 4), dtype=np.float32)
+    Each row sits at its actual (negative) frame position relative to the
+    first frame after the state, so gaps spanning the resume point have
+    the same length as in an uninterrupted run.
+    """
+    if state is None:
+        return _records_array([])
+    tracks = state.tracks
+    ids = tracks.order
+    return np.column_stack(
+        [
+            tracks.output_count[ids] - state.frame_count - 1,
+            ids,
+            tracks.cls_id[ids],
+            tracks.output_center[ids],
+        ]
+    ).astype(np.float64)
+
+
+def _iter_tracked_frames(
+    input_data,
+    start_frame,
+    start_map,
+    state=None,
+    checkpoints=None,
+    stop_on_loss=True,
+    events=None,
+    profiler=None,
+    config=None,
+    losses=None,
+):
+    """The tracking loop, one frame at a time.
+
+    Yields (frame_index, frame_records) for every tracked frame, where
+    frame_records is a list of (track id, class id, x, y) tuples of the
+    tracks observed in the frame (gaps are filled afterwards, see
+    tracking.interpolation). The generator's return value is the tuple
+    (last_frame_index, lost_ids).
+    """
+    config = config or DEFAULT_CONFIG
+    if state is None:
+        # Initialize ByteTrack
+        state = TrackerState(config.create_byte_tracker(), config.max_allowed_id)
+    run_key = checkpoint_key(start_frame, start_map, config)
+
+    # Tracking management variables (shared with state)
+    tracker = state.byte_tracker
+    tracks = state.tracks
+    free_ids = state.free_ids
+    track_id_map = state.track_id_map
+    frame_count = state.frame_count
+    active_track_counts = []
+    lost_array = state.lost_array
+    frame_index = state.frame_index
+
+    # Decided once so that a disabled event log costs nothing in the loop
+    log_put = events is not None and events.enabled(event_log.PUT)
+    log_lost = events is not None and events.enabled(event_log.LOST)
+    log_lost_long = events is not None and events.enabled(event_log.LOST_LONG)
+    # Lost ids are only held (and re-links looked for) with a loss report
+    hold_lost = losses is not None
+    # Likewise for the stage profiler: lap() is only called when profiling
+    profile = profiler is not None
+    clock = profiling.clock
+
+    if not isinstance(input_data, DetectionChunk):
+        input_data = DetectionChunk.from_frames(input_data)
+
+    # Drop low-confidence and off-pitch detections of the whole chunk at
+    # once; the start frame keeps all objects, start_map indexes them
+    if profile:
+        lap_start = clock()
+    input_data = prefilter(input_data, config, input_data.position(start_frame))
+    if profile:
+        profiler.lap(profiling.PREFILTER, lap_start)
+
+    for pos in range(len(input_data)):
+        if profile:
+            lap_start = clock()
+        frame_count += 1
+        frame_index = int(input_data.frame_index[pos])
+        state.frame_count = frame_count
+        state.frame_index = frame_index
+        rows = input_data.rows(pos)
+
+        # Combined top-down view: "right" detections come with x already
+        # shifted (global_x), the input itself is never modified
+        x = input_data.global_x[rows]
+        y = input_data.centers[rows, 1]
+        bboxes = np.column_stack([x - 2.5, y - 2.5, x + 2.5, y + 2.5]).astype(
+            np.float32
+        )
 
         detection_supervision = sv.Detections(
             xyxy=bboxes,
-            confidence=np.array(confidences, dtype=np.float32),
-            class_id=np.array(class_ids, dtype=np.int32),
+            confidence=np.array(input_data.confidence[rows], dtype=np.float32),
+            class_id=np.array(input_data.team_index[rows], dtype=np.int32),
         )
+        if profile:
+            lap_start = profiler.lap(profiling.DETECTIONS, lap_start)
 
         tracked_objects = tracker.update_with_detections(detection_supervision)
-        frame_tracking_data = {"frame_index": frame_index, "objects": []}
-        updated_tracks = set()
-
-        for index, track in enumerate(tracked_objects):
-            bbox = track[0].tolist()
-            confidence = track[2]
-            class_id = track[3]
-            center_x = (bbox[0] + bbox[2]) / 2
-            center_y = (bbox[1] + bbox[3]) / 2
+        if profile:
+            lap_start = profiler.lap(profiling.BYTETRACK, lap_start)
+        frame_records = []  # (track id, class id, x, y) per object
+
+        # Centers of all tracked objects; new external ids still need an internal id
+        xyxy = tracked_objects.xyxy.astype(np.float64)
+        track_centers = ((xyxy[:, :2] + xyxy[:, 2:]) / 2).tolist()
+        track_classes = tracked_objects.class_id.tolist()
+        external_ids = tracked_objects.tracker_id.tolist()
+        new_rows = [
+            index
+            for index, external_id in enumerate(external_ids)
+            if external_id not in track_id_map
+        ]
+
+        # Assign all new tracks of the frame to free internal ids in one batch
+        assigned = {}
+        if new_rows and free_ids:
+            forced_ids = None
+            if frame_index == start_frame:
+                forced_ids = [start_map.get(index) for index in new_rows]
+            for row, internal_id, distance in assign_new_tracks(
+                [track_centers[index] for index in new_rows],
+                [track_classes[index] for index in new_rows],
+                free_ids.ids().tolist(),
+                tracks,
+                max_distance=config.max_match_distance,
+                forced_ids=forced_ids,
+            ):
+                assigned[new_rows[row]] = (internal_id, distance)
+
+        for index, external_id in enumerate(external_ids):
+            center_x, center_y = track_centers[index]
+            class_id = track_classes[index]
 
-            external_id = track[4]
             if external_id not in track_id_map:
-                if reusable_ids:
-                    distances = []
-                    for internal_id in reusable_ids:
-                        if internal_id in active_tracks:
-                            if class_id == active_tracks[internal_id]["cls_id"]:
-                                prev_center = active_tracks[internal_id]["center"]
-                                distance_delta = np.sqrt(
-                                    (center_x - prev_center[0]) ** 2
-                                    + (center_y - prev_center[1]) ** 2
-                                )
-                                distances.append((internal_id, distance_delta))
-                        else:
-                            # For detections in the start frame, try to use forced id from start_map if available
-                            if frame_index == start_frame and index in start_map:
-                                forced_internal_id = start_map[index]
-                                for internal_id in reusable_ids:
-                                    if internal_id == forced_internal_id:
-                                        distances.append((internal_id, 0))
-                                    else:
-                                        distances.append((internal_id, float("inf")))
-                            else:
-                                distances.append((internal_id, 0))
-                    if len(distances) == 0:
-                        continue
-                    min_id, min_distance = min(distances, key=lambda x: x[1])
-                    if min_distance > 28:  # Threshold for matching distance
-                        continue
-                    internal_id = min_id
-                    reusable_ids.remove(internal_id)
-                    print(
-                        "Put,",
-                        internal_id,
-                        ",at frame",
+                if index not in assigned:
+                    continue
+                internal_id, min_distance = assigned[index]
+                free_ids.acquire(internal_id)
+                if log_put:
+                    events.record(
                         frame_index,
-                        f"with distance={min_distance}",
-                    )
-                    track_id_map[external_id] = internal_id
-                    active_tracks[internal_id] = {
-                        "frame_count": frame_count,
-                        "center": [center_x, center_y],
-                        "cls_id": class_id,
-                        "active": True,
-                    }
-                    updated_tracks.add(internal_id)
-                    frame_tracking_data["objects"].append(
-                        {
-                            "track_id": int(internal_id),
-                            "class_id": int(active_tracks[internal_id]["cls_id"]),
-                            "confidence": float(confidence),
-                            "bbox": list(map(float, bbox)),
-                            "center": list(map(float, [center_x, center_y])),
-                        }
+                        event_log.PUT,
+                        internal_id,
+                        external_id,
+                        min_distance,
                     )
-                else:
-                    continue
+                track_id_map[external_id] = internal_id
+                tracks.assign(
+                    internal_id,
+                    external_id,
+                    frame_count,
+                    track_centers[index],
+                    class_id,
+                )
+                tracks.record_output(internal_id, frame_count, track_centers[index])
+                frame_records.append((internal_id, class_id, center_x, center_y))
             else:
                 internal_id = track_id_map[external_id]
-                active_tracks[internal_id]["frame_count"] = frame_count
-                active_tracks[internal_id]["center"] = [center_x, center_y]
-                if class_id != active_tracks[internal_id]["cls_id"]:
-                    active_tracks[internal_id]["active"] = False
+                tracks.last_seen[internal_id] = frame_count
+                tracks.center[internal_id] = track_centers[index]
+                if class_id != tracks.cls_id[internal_id]:
+                    # Not output: the track keeps its last position of its class
+                    tracks.active[internal_id] = False
                 else:
-                    updated_tracks.add(internal_id)
-                    frame_tracking_data["objects"].append(
-                        {
-                            "track_id": int(internal_id),
-                            "class_id": int(active_tracks[internal_id]["cls_id"]),
-                            "confidence": float(confidence),
-                            "bbox": list(map(float, bbox)),
-                            "center": list(map(float, [center_x, center_y])),
-                        }
-                    )
-
-        # Add interpolated detection for active tracks not updated in the current frame
-        for internal_id, data in active_tracks.items():
-            if internal_id not in updated_tracks:  # data["active"] and
-                center = data["center"]
-                bbox = [
-                    center[0] - 2.5,
-                    center[1] - 2.5,
-                    center[0] + 2.5,
-                    center[1] + 2.5,
-                ]
-                frame_tracking_data["objects"].append(
-                    {
-                        "track_id": int(internal_id),
-                        "class_id": int(data["cls_id"]),
-                        "confidence": 0.0,
-                        "bbox": bbox,
-                        "center": center,
-                    }
-                )
-
-        # Manage lost tracks and update reusable ids
-        for internal_id, data in list(active_tracks.items()):
-            lost = False
-            if not data["active"]:
-                if internal_id not in reusable_ids:
-                    lost = True
-            elif frame_count - data["frame_count"] > 10:
-                lost = True
-
-            if lost:
-                print("Lost", internal_id, "at frame", frame_index)
-                active_tracks[internal_id]["active"] = False
-                reusable_ids.append(internal_id)
-                external_ids_to_remove = [
-                    k for k, v in track_id_map.items() if v == internal_id
-                ]
-                for ext_id in external_ids_to_remove:
-                    del track_id_map[ext_id]
-
-        for i in range(23):
-            if (i + 1) in active_tracks and not active_tracks[i + 1]["active"]:
-                lost_tracker[i] += 1
-                if lost_tracker[i] > 60:
-                    print("Lost for 1 second, index=", i + 1, "at frame", frame_index)
-                    lost_array.add(i + 1)
-            else:
-                lost_tracker[i] = 0
-
-        if len(lost_array) > 0:
-            # Iterate through all tracks in active_tracks
-            for internal_id, data in active_tracks.items():
-                if not data["active"]:
-
-                    lost_array.add(internal_id)
-                    # Use internal_id-1 as index for lost_tracker
-                    tracker_index = internal_id - 1
-                    # Check if the track has been lost for ≤ 60 frames
-                    if tracker_index < len(
-                        lost_tracker
-                    ):  # and lost_tracker[tracker_index] <= 60:
-                        # Add interpolation entry only if not already in the final frame data
-                        if not any(
-                            d["track_id"] == internal_id
-                            for d in frame_tracking_data["objects"]
-                        ):
-                            center = data["center"]
-                            bbox = [
-                                center[0] - 2.5,
-                                center[1] - 2.5,
-                                center[0] + 2.5,
-                                center[1] + 2.5,
-                            ]
-                            frame_tracking_data["objects"].append(
-                                {
-                                    "track_id": int(internal_id),
-                                    "class_id": int(data["cls_id"]),
-                                    "confidence": 0.0,  # Interpolated detection
-                                    "bbox": bbox,
-                                    "center": center,
-                                }
-                            )
-                    # else:
-                    #     # For tracks lost > 60 frames, ensure they are added to lost_array (if not already)
-                    #     if internal_id not in lost_array:
-                    #         lost_array.append(internal_id)
-
-            tracking_data.append(frame_tracking_data)
-            sorted_lost_array = sorted(
-                lost_array,
-                key=lambda track_id: lost_tracker[track_id - 1],
-                reverse=True,
+                    tracks.record_output(internal_id, frame_count, track_centers[index])
+                    frame_records.append((internal_id, class_id, center_x, center_y))
+        if hold_lost and len(assigned) < len(new_rows):
+            losses.record_untracked(
+                frame_index,
+                [external_ids[index] for index in new_rows if index not in assigned],
             )
-            return frame_index, sorted_lost_array, format_tracking_data(tracking_data)
-
-        else:
-            tracking_data.append(frame_tracking_data)
-
-        current_active_count = sum(
-            1 for track in active_tracks.values() if track["active"]
+        if hold_lost and new_rows and tracks.held.any():
+            for index in new_rows:
+                if losses.check_track(external_ids[index]):
+                    _record_relinks(
+                        losses,
+                        tracks,
+                        frame_index,
+                        track_centers[index],
+                        track_classes[index],
+                        track_id_map.get(external_ids[index]),
+                        config.max_relink_distance,
+                    )
+        if profile:
+            lap_start = profiler.lap(profiling.ID_MAPPING, lap_start)
+
+        # Manage lost tracks and release their ids: inactive tracks still
+        # holding their id (unless held), and active tracks not updated for
+        # a while
+        ids = tracks.order
+        lost = np.where(
+            tracks.active[ids],
+            frame_count - tracks.last_seen[ids] > config.max_missing_frames,
+            ~free_ids.free[ids] & ~tracks.held[ids],
         )
-        active_track_counts.append((frame_index, current_active_count))
-
-    sorted_lost_array = sorted(
-        lost_array, key=lambda track_id: lost_tracker[track_id - 1], reverse=True
-    )
-    return frame_index, sorted_lost_array, format_tracking_data(tracking_data)
+        lost_ids = ids[lost]
+        lost_in_frame = len(lost_ids) > 0
+        if lost_in_frame:
+            lost_external_ids = tracks.release(lost_ids)
+            free_ids.release(lost_ids)
+            for internal_id, external_id in zip(
+                lost_ids.tolist(), lost_external_ids.tolist()
+            ):
+                if log_lost:
+                    events.record(frame_index, event_log.LOST, internal_id, external_id)
+                track_id_map.pop(external_id, None)
+
+        lost_frames = tracks.count_lost_frames()
+        lost_long = np.flatnonzero(lost_frames > config.lost_report_frames).tolist()
+        if log_lost_long:
+            for internal_id in lost_long:
+                if internal_id not in lost_array:
+                    events.record(frame_index, event_log.LOST_LONG, internal_id)
+        lost_array.update(lost_long)
+        if hold_lost:
+            newly_held = [
+                internal_id for internal_id in lost_long if not tracks.held[internal_id]
+            ]
+            if newly_held:
+                # Keep the ids out of the pool until an operator re-links them,
+                # and add as many spare ids above max_id for new tracks
+                tracks.held[newly_held] = True
+                for internal_id in newly_held:
+                    if internal_id in free_ids:
+                        free_ids.acquire(internal_id)
+                tracks.grow(len(newly_held))
+                free_ids.grow(len(newly_held))
+                losses.record_loss(frame_index, newly_held)
+
+        if lost_array:
+            # Once a track is lost for good, report every inactive track
+            lost_array.update(ids[~tracks.active[ids]].tolist())
+        if profile:
+            profiler.lap(profiling.LOST_TRACKS, lap_start)
+
+        yield frame_index, frame_records
+
+        if profile:
+            lap_start = clock()
+        if lost_array and stop_on_loss:
+            if checkpoints is not None:
+                checkpoints.save(run_key, state)
+                if profile:
+                    profiler.lap(profiling.CHECKPOINT, lap_start)
+            return frame_index, _sorted_lost_ids(lost_array, tracks)
+
+        if lost_in_frame and checkpoints is not None:
+            checkpoints.save(run_key, state)
+            if profile:
+                profiler.lap(profiling.CHECKPOINT, lap_start)
+
+        active_track_counts.append((frame_index, int(tracks.active.sum())))
+
+    if checkpoints is not None and len(input_data):
+        if profile:
+            lap_start = clock()
+        checkpoints.save(run_key, state)
+        if profile:
+            profiler.lap(profiling.CHECKPOINT, lap_start)
+
+    return frame_index, _sorted_lost_ids(lost_array, tracks)
+
+
+def _record_relinks(
+    losses, tracks, frame_index, center, class_id, internal_id, max_distance
+):
+    """Record the held ids a new track may be the reappearance of."""
+    held = np.flatnonzero(tracks.held & (tracks.cls_id == class_id))
+    distances = np.linalg.norm(tracks.center[held] - center, axis=1)
+    near = distances <= max_distance
+    for lost_id, distance in zip(held[near].tolist(), distances[near].tolist()):
+        losses.record_relink(frame_index, lost_id, internal_id, distance, center)
+
+
+def _sorted_lost_ids(lost_array, tracks):
+    # Longest lost first
+    lost_frames = tracks.lost_frames.tolist()
+    return sorted(lost_array, key=lambda track_id: lost_frames[track_id], reverse=True)
 
 
 def format_tracking_data(tracking_data):
@@ -343,7 +692,8 @@ def format_tracking_data(tracking_data):
       - Renames "frame_index" to "fr".
       - Renames "objects" to "obj".
       - For each object in each frame:
-          - Reverse-transforms the "center" coordinate using reverse_transform_point.
+          - Reverse-transforms the "center" coordinate (all centers are transformed
+            in one batch with reverse_transform_points).
           - Rounds the transformed center coordinates (x, y) to one decimal place.
           - Removes the original "center", "confidence", and "bbox" properties.
           - Renames "track_id" to "id".
@@ -357,6 +707,16 @@ def format_tracking_data(tracking_data):
     Returns:
       The updated tracking_data with the new format.
     """
+    # Reverse-transform every center of the chunk in one batch
+    centers = [
+        obj["center"]
+        for frame in tracking_data
+        for obj in frame["objects"]
+        if "center" in obj
+    ]
+    is_right, new_centers = reverse_transform_points(centers)
+    reversed_centers = iter(zip(is_right.tolist(), new_centers.tolist()))
+
     for frame in tracking_data:
         frame["fr"] = frame["frame_index"]
         del frame["frame_index"]
@@ -365,7 +725,7 @@ def format_tracking_data(tracking_data):
         if "obj" in frame:
             for obj in frame["obj"]:
                 if "center" in obj:
-                    isRight, new_center = reverse_transform_point(obj["center"])
+                    isRight, new_center = next(reversed_centers)
                     # Round the transformed center coordinates to 1 decimal point.
                     new_center = [round(coord, 1) for coord in new_center]
                     del obj["center"]
@@ -380,3 +740,102 @@ def format_tracking_data(tracking_data):
                     if "bbox" in obj:
                         del obj["bbox"]
     return tracking_data
+
+
+def _records_array(track_records):
+    return np.array(track_records, dtype=np.float64).reshape(-1, 5)
+
+
+def _format_track_records(frame_indices, records):
+    return format_tracking_arrays(
+        frame_indices,
+        records[:, 0].astype(np.int64),
+        records[:, 1].astype(np.int64),
+        records[:, 2].astype(np.int64),
+        records[:, 3:],
+    )
+
+
+def _format_frame(frame_index, frame_records):
+    """Format one tracked frame, see _iter_tracked_frames."""
+    records = np.array(frame_records, dtype=np.float64).reshape(-1, 4)
+    (frame,) = _iter_formatted_frames(
+        [frame_index],
+        np.zeros(len(records), dtype=np.int64),
+        records[:, 0].astype(np.int64),
+        records[:, 1].astype(np.int64),
+        records[:, 2:],
+    )
+    return frame
+
+
+def _iter_formatted_frames(frame_indices, frame_pos, track_ids, class_ids, centers):
+    """Yield output frames in the format produced by format_tracking_data."""
+    is_right, new_centers = reverse_transform_points(centers)
+    objects = [
+        {
+            "id": track_id,
+            "cls_id": class_id,
+            # Round the transformed center coordinates to 1 decimal point.
+            "c": [round(x, 1), round(y, 1)],
+            "src": 1 if right else 0,
+        }
+        for track_id, class_id, (x, y), right in zip(
+            np.asarray(track_ids).tolist(),
+            np.asarray(class_ids).tolist(),
+            new_centers.tolist(),
+            is_right.tolist(),
+        )
+    ]
+    bounds = np.searchsorted(frame_pos, np.arange(len(frame_indices) + 1)).tolist()
+    for pos, frame_index in enumerate(np.asarray(frame_indices).tolist()):
+        yield {"fr": frame_index, "obj": objects[bounds[pos] : bounds[pos + 1]]}
+
+
+def format_tracking_arrays(frame_indices, frame_pos, track_ids, class_ids, centers):
+    """Build the formatted tracking output directly from per-object arrays.
+
+    Produces the same structure as format_tracking_data ({"fr", "obj":
+    [{"id", "cls_id", "c", "src"}]}) without creating and rewriting
+    intermediate object dicts. All centers are reverse-transformed in one
+    batch.
+
+    :param frame_indices: Frame index of every output frame, in order.
+    :param frame_pos: (M,) non-decreasing output frame position of each
+        object.
+    :param track_ids: (M,) track id of each object.
+    :param class_ids: (M,) class id of each object.
+    :param centers: (M, 2) top-down centers of the objects.
+    :return: List of formatted frame dicts.
+    """
+    return list(
+        _iter_formatted_frames(frame_indices, frame_pos, track_ids, class_ids, centers)
+    )
+
+
+def write_tracking_json(
+    stream, frame_indices, frame_pos, track_ids, class_ids, centers
+):
+    """Write the formatted tracking output as a JSON array to a text stream.
+
+    Frames are serialized one at a time, so the formatted list is never
+    held in memory as a whole. The text written is identical to
+    ``json.dump(format_tracking_arrays(...), stream)``.
+
+    :param stream: Writable text stream.
+    :param frame_indices: Frame index of every output frame, in order.
+    :param frame_pos: (M,) non-decreasing output frame position of each
+        object.
+    :param track_ids: (M,) track id of each object.
+    :param class_ids: (M,) class id of each object.
+    :param centers: (M, 2) top-down centers of the objects.
+    """
+    stream.write("[")
+    frames = _iter_formatted_frames(
+        frame_indices, frame_pos, track_ids, class_ids, centers
+    )
+    for pos, frame in enumerate(frames):
+        if pos:
+            stream.write(", ")
+        stream.write(json.dumps(frame))
+    stream.write("]")
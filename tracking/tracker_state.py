@@ -0,0 +1,339 @@
+"""Serializable tracker state and checkpoints of it.
+
+TrackerState bundles everything perform_tracking_from_json carries from
+one frame to the next: the ByteTrack internals plus the internal-id
+bookkeeping, whose per-id part lives in the array-backed TrackTable and
+IdPool. CheckpointStore keeps serialized snapshots of that state,
+taken at chunk ends and loss points, so a later request can resume
+tracking from a checkpoint instead of re-warming from the start frame.
+"""
+
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+
+import numpy as np
+import supervision as sv
+
+MAX_ALLOWED_ID = 23  # Maximum allowed internal id
+
+
+class TrackTable:
+    """Per-track bookkeeping in flat arrays indexed by internal id.
+
+    Ids run from 1 to max_id; row 0 is unused. An id is "used" once it has
+    been assigned to a track, and stays used (with its last center and
+    class) after the track is lost so that it can be re-acquired.
+
+    :param max_id: Highest internal id.
+    """
+
+    def __init__(self, max_id):
+        size = max_id + 1
+        self.max_id = max_id
+        self.used = np.zeros(size, dtype=bool)
+        self.active = np.zeros(size, dtype=bool)
+        self.last_seen = np.zeros(size, dtype=np.int64)  # Frame count of last update
+        self.cls_id = np.zeros(size, dtype=np.int64)
+        self.center = np.zeros((size, 2), dtype=np.float64)
+        self.lost_frames = np.zeros(size, dtype=np.int64)  # Consecutive frames inactive
+        self.external_id = np.full(size, -1, dtype=np.int64)  # ByteTrack id, -1 if none
+        self.held = np.zeros(size, dtype=bool)  # Lost for good, kept out of the pool
+        # Frame count and position of the last observation output per id
+        self.output_count = np.zeros(size, dtype=np.int64)
+        self.output_center = np.zeros((size, 2), dtype=np.float64)
+        self.order = np.empty(0, dtype=np.int64)  # Used ids in order of first use
+
+    def __contains__(self, internal_id):
+        return bool(self.used[internal_id])
+
+    def assign(self, internal_id, external_id, frame_count, center, cls_id):
+        """Start (or restart) the track of internal_id."""
+        if not self.used[internal_id]:
+            self.used[internal_id] = True
+            self.order = np.append(self.order, internal_id)
+        self.active[internal_id] = True
+        self.external_id[internal_id] = external_id
+        self.last_seen[internal_id] = frame_count
+        self.center[internal_id] = center
+        self.cls_id[internal_id] = cls_id
+
+    def record_output(self, internal_id, frame_count, center):
+        """Remember the position output for internal_id in a frame.
+
+        Gap filling of a resumed run starts from these positions, see
+        tracker._state_anchors.
+        """
+        self.output_count[internal_id] = frame_count
+        self.output_center[internal_id] = center
+
+    def release(self, internal_ids):
+        """Deactivate ids and detach them from their ByteTrack ids.
+
+        :param internal_ids: Array of internal ids.
+        :return: The external ids they were attached to (-1 where none).
+        """
+        external_ids = self.external_id[internal_ids]
+        self.active[internal_ids] = False
+        self.external_id[internal_ids] = -1
+        return external_ids
+
+    def grow(self, count):
+        """Add count ids above max_id, unused.
+
+        :param count: Number of ids to add.
+        """
+        self.max_id += count
+        for name in (
+            "used",
+            "active",
+            "last_seen",
+            "cls_id",
+            "center",
+            "lost_frames",
+            "held",
+            "output_count",
+            "output_center",
+        ):
+            array = getattr(self, name)
+            extra = np.zeros((count,) + array.shape[1:], dtype=array.dtype)
+            setattr(self, name, np.concatenate([array, extra]))
+        self.external_id = np.append(
+            self.external_id, np.full(count, -1, dtype=np.int64)
+        )
+
+    def count_lost_frames(self):
+        """Advance the lost counters by one frame.
+
+        Counters of used, inactive ids are incremented, all others reset.
+
+        :return: The updated lost_frames array.
+        """
+        inactive = self.used & ~self.active
+        self.lost_frames[inactive] += 1
+        self.lost_frames[~inactive] = 0
+        return self.lost_frames
+
+
+class IdPool:
+    """Free internal ids as a bitset.
+
+    Acquiring a given id, releasing ids and membership tests are O(1) per
+    id; the free ids are listed in ascending order with one vectorized
+    scan, so the bookkeeping stays flat as max_id grows.
+
+    :param max_id: Highest internal id; ids 1 to max_id start out free.
+    """
+
+    def __init__(self, max_id):
+        self.max_id = max_id
+        self.free = np.ones(max_id + 1, dtype=bool)
+        self.free[0] = False
+        self._count = max_id
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, internal_id):
+        return bool(self.free[internal_id])
+
+    def __iter__(self):
+        return iter(self.ids().tolist())
+
+    def ids(self):
+        """Return the free ids, ascending."""
+        return np.flatnonzero(self.free)
+
+    def acquire(self, internal_id=None):
+        """Take a free id out of the pool.
+
+        :param internal_id: The id to take, defaults to the smallest free one.
+        :return: The acquired id.
+        :raises ValueError: If the id is not free (or none is left).
+        """
+        if internal_id is None:
+            if not self._count:
+                raise ValueError("No free internal id left")
+            internal_id = int(np.argmax(self.free))
+        elif not self.free[internal_id]:
+            raise ValueError(f"Internal id {internal_id} is not free")
+        self.free[internal_id] = False
+        self._count -= 1
+        return internal_id
+
+    def grow(self, count):
+        """Add count free ids above max_id.
+
+        :param count: Number of ids to add.
+        """
+        self.max_id += count
+        self.free = np.append(self.free, np.ones(count, dtype=bool))
+        self._count += count
+
+    def release(self, internal_ids):
+        """Return ids to the pool; ids that are already free are ignored.
+
+        :param internal_ids: An id or an array of ids.
+        """
+        internal_ids = np.unique(internal_ids)
+        released = internal_ids[~self.free[internal_ids]]
+        self.free[released] = True
+        self._count += len(released)
+
+
+class TrackerState:
+    """Complete, picklable state of a tracking run.
+
+    :param byte_tracker: The sv.ByteTrack instance driving the run.
+    :param max_allowed_id: Highest internal id handed out.
+    """
+
+    def __init__(self, byte_tracker, max_allowed_id=MAX_ALLOWED_ID):
+        self.byte_tracker = byte_tracker
+        self.max_allowed_id = max_allowed_id
+        self.tracks = TrackTable(max_allowed_id)
+        self.free_ids = IdPool(max_allowed_id)  # Ids not held by an active track
+        self.track_id_map = {}  # Map external track ids to internal ids
+        self.frame_count = 0  # Frames processed so far
+        self.frame_index = None  # Last processed frame index
+        self.lost_array = set()  # Ids inactive for more than a second
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # ByteTrack itself is wrapped by a deprecation decorator and cannot be
+        # pickled by reference, but all of its state lives in its __dict__.
+        # That layout is private to supervision, so the version is saved too.
+        state["byte_tracker"] = vars(self.byte_tracker).copy()
+        state["supervision_version"] = sv.__version__
+        return state
+
+    def __setstate__(self, state):
+        version = state.pop("supervision_version", None)
+        if version != sv.__version__:
+            raise ValueError(
+                f"State saved with supervision {version}, "
+                f"cannot restore it with {sv.__version__}"
+            )
+        byte_tracker = sv.ByteTrack()
+        saved = state.pop("byte_tracker")
+        if set(saved) != set(vars(byte_tracker)):
+            raise ValueError("State does not match the attributes of sv.ByteTrack")
+        byte_tracker.__dict__.update(saved)
+        self.__dict__.update(state)
+        self.byte_tracker = byte_tracker
+
+    def to_bytes(self):
+        """Serialize the state."""
+        return pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Restore a state produced by to_bytes().
+
+        :raises ValueError: If the state was saved with another supervision
+            version.
+        """
+        state = pickle.loads(data)
+        if not isinstance(state, cls):
+            raise TypeError(f"Expected a serialized {cls.__name__}")
+        return state
+
+
+def checkpoint_key(start_frame, start_map, config):
+    """Identify a tracking run by its start frame, start mapping and config.
+
+    :param start_frame: The run's start frame index.
+    :param start_map: Mapping from start frame object indices to ids.
+    :param config: The run's TrackerConfig.
+    :return: A short string key.
+    """
+    items = sorted((int(index), int(track_id)) for index, track_id in start_map.items())
+    digest = hashlib.sha1(repr((items, config.key())).encode()).hexdigest()[:16]
+    return f"{start_frame}-{digest}"
+
+
+class CheckpointStore:
+    """Bounded store of serialized TrackerState snapshots.
+
+    Snapshots are kept in memory (least recently saved are evicted first)
+    and, if a directory is given, also written to disk.
+
+    :param max_entries: Maximum number of snapshots kept in memory.
+    :param directory: Optional directory mirroring the snapshots as files.
+    """
+
+    def __init__(self, max_entries=256, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries = OrderedDict()  # {(key, frame_index): bytes}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _path(self, key, frame_index):
+        return os.path.join(self.directory, f"{key}_{frame_index}.ckpt")
+
+    def save(self, key, state):
+        """Snapshot state under key at its current frame index."""
+        data = state.to_bytes()
+        entry = (key, state.frame_index)
+        self._entries[entry] = data
+        self._entries.move_to_end(entry)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(key, state.frame_index)
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+
+    def load(self, key, frame_index):
+        """Return the TrackerState saved for key at frame_index, or None.
+
+        Snapshots saved with another supervision version (e.g. files left
+        in the directory by an older install) are treated as missing.
+        """
+        data = self._entries.get((key, frame_index))
+        if data is None and self.directory is not None:
+            try:
+                with open(self._path(key, frame_index), "rb") as f:
+                    data = f.read()
+            except OSError:
+                return None
+        if data is None:
+            return None
+        try:
+            return TrackerState.from_bytes(data)
+        except ValueError:
+            return None
+
+    def frames(self, key):
+        """Return the sorted frame indices that have a checkpoint for key."""
+        frames = {frame for entry_key, frame in self._entries if entry_key == key}
+        if self.directory is not None and os.path.isdir(self.directory):
+            prefix = key + "_"
+            for name in os.listdir(self.directory):
+                if name.startswith(prefix) and name.endswith(".ckpt"):
+                    frames.add(int(name[len(prefix) : -len(".ckpt")]))
+        return sorted(frames)
+
+    def latest(self, key, frame_index=None):
+        """Return the newest checkpoint for key at or before frame_index.
+
+        :param key: Run key, see checkpoint_key().
+        :param frame_index: Upper bound (inclusive), None for no bound.
+        :return: A restored TrackerState, or None.
+        """
+        frames = [
+            frame
+            for frame in self.frames(key)
+            if frame_index is None or frame <= frame_index
+        ]
+        return self.load(key, frames[-1]) if frames else None
+
+    def clear(self):
+        """Drop all in-memory snapshots."""
+        self._entries.clear()
@@ -1,13 +1,84 @@
+import os
+
 import numpy as np
 
+RIGHT_HOMOGRAPHY_PATH = "al1_homography_matrix.txt"
+LEFT_HOMOGRAPHY_PATH = "al2_homography_matrix.txt"
+RIGHT_OFFSET = 347  # x offset of the right camera in the top-down view
+
+
+class Homography:
+    """
+    A homography matrix loaded from a text file, with its inverse cached.
+
+    The matrix is read once and reloaded only when the file's modification
+    time changes, so callers can ask for it per point without touching the disk.
+
+    Parameters:
+        path (str): Path to the whitespace-separated 3x3 matrix file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._mtime_ns = None
+        self._matrix = None
+        self._inverse = None
+
+    def refresh(self):
+        """Reloads the matrix (and its inverse) if the file has changed."""
+        mtime_ns = os.stat(self.path).st_mtime_ns
+        if mtime_ns != self._mtime_ns:
+            matrix = np.loadtxt(self.path)
+            self._inverse = np.linalg.inv(matrix)
+            self._matrix = matrix
+            self._mtime_ns = mtime_ns
+
+    @property
+    def matrix(self):
+        """The forward 3x3 homography matrix."""
+        self.refresh()
+        return self._matrix
+
+    @property
+    def inverse(self):
+        """The cached inverse of the homography matrix."""
+        self.refresh()
+        return self._inverse
+
+    @property
+    def version(self):
+        """The modification time (ns) of the loaded matrix file."""
+        self.refresh()
+        return self._mtime_ns
+
+
+_homographies = {}
+
+
+def get_homography(path):
+    """
+    Returns the shared Homography for a matrix file, creating it on first use.
+
+    Parameters:
+        path (str): Path to the homography matrix file.
+
+    Returns:
+        Homography: The cached homography for that path.
+    """
+    key = os.path.abspath(path)
+    homography = _homographies.get(key)
+    if homography is None:
+        homography = _homographies[key] = Homography(key)
+    return homography
+
 
 def reverse_transform_point(point):
     """
     Reverse transforms a 2D point using one of two homography matrices.
 
-    For points where the x-coordinate is greater than 347, it subtracts 347 and reads
+    For points where the x-coordinate is greater than 347, it subtracts 347 and uses
     the homography matrix from "al1_homography_matrix.txt". Otherwise, it uses the matrix from
-    "al2_homography_matrix.txt". Then, it computes the inverse and applies it.
+    "al2_homography_matrix.txt". The cached inverse of that matrix is then applied.
 
     Parameters:
         point (list or tuple): The [x, y] coordinate to reverse transform.
@@ -17,15 +88,15 @@ def reverse_transform_point(point):
         new_point (list): The reverse-transformed [x, y] coordinate.
     """
     x, y = point
-    isRight = x > 347
-    # Select the appropriate homography matrix file based on the x-coordinate.
-    H = np.loadtxt(
-        "al1_homography_matrix.txt" if isRight else "al2_homography_matrix.txt"
+    isRight = x > RIGHT_OFFSET
+    # Select the appropriate homography based on the x-coordinate.
+    homography = get_homography(
+        RIGHT_HOMOGRAPHY_PATH if isRight else LEFT_HOMOGRAPHY_PATH
     )
     # If the point is from the right side, adjust x by subtracting 347.
-    x_adjusted = x - 347 if isRight else x
-    # Compute the inverse of the homography matrix.
-    H_inv = np.linalg.inv(H)
+    x_adjusted = x - RIGHT_OFFSET if isRight else x
+    # Use the cached inverse of the homography matrix.
+    H_inv = homography.inverse
     # Convert the adjusted point to homogeneous coordinates.
     homogeneous_point = np.array([x_adjusted, y, 1])
     # Apply the inverse transformation.
@@ -35,9 +106,6 @@ def reverse_transform_point(point):
     return isRight, [float(orig_point[0]), float(orig_point[1])]
 
 
-import numpy as np
-
-
 def transform_point(point, src):
     """
     Forward transforms a 2D point using one of two homography matrices.
@@ -54,12 +122,10 @@ def transform_point(point, src):
     Returns:
         new_point (list): The forward-transformed [x, y] coordinate. If src==1, the x value is increased by 347.
     """
-    # Load the appropriate homography matrix based on src
-    H = (
-        np.loadtxt("al2_homography_matrix.txt")
-        if src == 0
-        else np.loadtxt("al1_homography_matrix.txt")
-    )
+    # Look up the appropriate (cached) homography matrix based on src
+    H = get_homography(
+        LEFT_HOMOGRAPHY_PATH if src == 0 else RIGHT_HOMOGRAPHY_PATH
+    ).matrix
 
     # Convert the input point to homogeneous coordinates
     homogeneous_point = np.array([point[0], point[1], 1])
@@ -72,11 +138,76 @@ def transform_point(point, src):
 
     # If src is 1, add 347 to the x-coordinate.
     if src == 1:
-        new_point[0] += 347
+        new_point[0] += RIGHT_OFFSET
 
     return new_point
 
 
+def _apply_homography(matrix, points):
+    """Applies a 3x3 homography to an (N, 2) array of points."""
+    homogeneous = np.column_stack([points, np.ones(len(points))])
+    mapped = homogeneous @ matrix.T
+    return mapped[:, :2] / mapped[:, 2:3]
+
+
+def transform_points(points, src):
+    """
+    Forward transforms a batch of 2D points, the vectorized form of transform_point.
+
+    Points with src == 0 use the matrix from "al2_homography_matrix.txt", all others
+    the matrix from "al1_homography_matrix.txt". Points with src == 1 get 347 added to
+    the resulting x-coordinate.
+
+    Parameters:
+        points (array-like): (N, 2) array of [x, y] coordinates.
+        src (array-like or int): Source indicator per point, or one for all points.
+
+    Returns:
+        new_points (np.ndarray): (N, 2) array of forward-transformed coordinates.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    src = np.broadcast_to(np.asarray(src), (len(points),))
+    right = src != 0
+
+    new_points = np.empty_like(points)
+    new_points[~right] = _apply_homography(
+        get_homography(LEFT_HOMOGRAPHY_PATH).matrix, points[~right]
+    )
+    new_points[right] = _apply_homography(
+        get_homography(RIGHT_HOMOGRAPHY_PATH).matrix, points[right]
+    )
+    new_points[src == 1, 0] += RIGHT_OFFSET
+    return new_points
+
+
+def reverse_transform_points(points):
+    """
+    Reverse transforms a batch of 2D points, the vectorized form of reverse_transform_point.
+
+    Points with x > 347 are shifted back by 347 and mapped with the inverse of the
+    "al1_homography_matrix.txt" matrix; the rest use the inverse of "al2_homography_matrix.txt".
+
+    Parameters:
+        points (array-like): (N, 2) array of [x, y] coordinates.
+
+    Returns:
+        is_right (np.ndarray): (N,) boolean array, True where the original x was > 347.
+        new_points (np.ndarray): (N, 2) array of reverse-transformed coordinates.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    is_right = points[:, 0] > RIGHT_OFFSET
+
+    new_points = np.empty_like(points)
+    new_points[~is_right] = _apply_homography(
+        get_homography(LEFT_HOMOGRAPHY_PATH).inverse, points[~is_right]
+    )
+    right_points = points[is_right] - [RIGHT_OFFSET, 0]
+    new_points[is_right] = _apply_homography(
+        get_homography(RIGHT_HOMOGRAPHY_PATH).inverse, right_points
+    )
+    return is_right, new_points
+
+
 # Example usage:
 # if __name__ == "__main__":
 #     with open("test.json", "r") as f: